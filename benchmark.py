@@ -0,0 +1,434 @@
+"""Headless end-to-end benchmark of the inspection cycle
+
+Usage:
+    python benchmark.py --source recording.mp4 [--cycles 50] [--warmup 1] [--realtime]
+                        [--backend onnxruntime] [--mysql-database circlip_bench]
+                        [--plc-latency 0.005] [--trigger-interval 0] [--output bench.json]
+
+Recorded footage (a video file, an image directory or a .npz frame archive)
+is replayed through the station's own capture thread, frame ring, model
+service, detection cycle, result writer and PLC worker. Results go to a SQLite
+stand-in for MySQL, or to the scratch MySQL database given with
+--mysql-database, and verdicts go to a local plc_simulator. The replay loops,
+runs at maximum speed unless --realtime is given, and cycles start back to
+back, or on each simulator trigger with --trigger-interval.
+
+Stages reported (milliseconds; db_write and plc_write are per batched write):
+    frame_read     waiting for and copying a batch of frames from the ring
+    preprocess     frame-change gating (thumbnail and difference)
+    inference      model call, including letterbox, ROI crop and NMS
+    verdict        tallying box counts and the early-exit check
+    color_convert  converting the verdict frame to the RGB result image
+    preview_emit   handing the result to the UI
+    db_write       one ResultWriter transaction
+    plc_write      one PLC register write
+    cycle          trigger to verdict queued for the PLC
+
+The JSON written with --output also holds frames per cycle, cycles per
+minute, peak RSS and the configuration, so runs can be compared across
+commits and hardware.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+import mysql.connector
+from PyQt5.QtCore import QCoreApplication
+from ui2 import (DB_CONFIG, MODEL_PATH, INFERENCE_BACKEND, INFERENCE_BACKENDS, INFERENCE_BATCH_SIZE,
+                 DETECTION_WINDOW, EARLY_EXIT_ENABLED, FRAME_DIFF_GATING, PLC_TRIGGER_REGISTER,
+                 PLC_RESULT_REGISTER, PLC_SOCKET_TIMEOUT, AutoInspectionThread, CaptureThread,
+                 DatabasePool, ModelService, PLCTrigger, PLCWorker, ResultWriter, SchemaMigrator,
+                 open_replay_source)
+from plc_simulator import PLCSimulator, percentile
+
+STAGES = ("frame_read", "preprocess", "inference", "verdict", "color_convert", "preview_emit",
+          "db_write", "plc_write", "cycle")
+STARTUP_TIMEOUT = 10.0  # seconds to wait for the replay and the simulator connection
+
+def to_sqlite(query):
+    """Rewrite one of ResultWriter's MySQL statements for SQLite"""
+    query, _, update = query.partition("ON DUPLICATE KEY UPDATE")
+    query = query.replace("%s", "?")
+    if update:
+        query += ("ON CONFLICT (period, period_start) DO UPDATE SET "
+                  + re.sub(r"VALUES\((\w+)\)", r"excluded.\1", update))
+    return query
+
+class SqliteCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, query, params=()):
+        self.cursor.execute(to_sqlite(query), params)
+
+    def executemany(self, query, rows):
+        self.cursor.executemany(to_sqlite(query), rows)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+class SqliteConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return SqliteCursor(self.db.cursor())
+
+    def commit(self):
+        self.db.commit()
+
+class SqlitePool:
+    """Stand-in for DatabasePool backed by a SQLite file, for the tables ResultWriter writes
+
+    SQLite errors are raised as mysql.connector errors, so the writer spools
+    and retries exactly as it would against MySQL.
+    """
+    available = True
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS detection_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                single_circlip_percentage REAL NOT NULL,
+                multiple_circlips_percentage REAL NOT NULL,
+                no_circlip_percentage REAL NOT NULL,
+                result TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS detection_rollups (
+                period TEXT NOT NULL,
+                period_start TEXT NOT NULL,
+                total INTEGER NOT NULL DEFAULT 0,
+                passed INTEGER NOT NULL DEFAULT 0,
+                single_sum REAL NOT NULL DEFAULT 0,
+                multiple_sum REAL NOT NULL DEFAULT 0,
+                none_sum REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (period, period_start)
+            );
+        """)
+
+    @contextmanager
+    def connection(self):
+        with self.lock:
+            try:
+                yield SqliteConnection(self.db)
+            except sqlite3.Error as e:
+                self.db.rollback()
+                raise mysql.connector.errors.DatabaseError(msg=str(e)) from e
+
+    @contextmanager
+    def transaction(self):
+        with self.connection() as connection:
+            yield connection
+            connection.commit()
+
+    def reset(self):
+        self.db.close()
+
+def mysql_pool(database):
+    """DatabasePool on a scratch database next to the station's, created and migrated if needed"""
+    config = dict(DB_CONFIG, database=database)
+    server = mysql.connector.connect(host=config["host"], user=config["user"], password=config["password"])
+    cursor = server.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`")
+    cursor.close()
+    server.close()
+    pool = DatabasePool(config)
+    with pool.connection() as connection:
+        SchemaMigrator(connection).migrate()
+    return pool
+
+class StageRecorder:
+    """Collects stage_observer samples from every pipeline thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def __call__(self, stage, seconds):
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def reset(self):
+        with self.lock:
+            self.samples = {}
+
+    def summary(self):
+        """Count, mean and p50/p95/p99/max in milliseconds per stage"""
+        with self.lock:
+            samples = {stage: [value * 1000 for value in values] for stage, values in self.samples.items()}
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        return {
+            stage: {
+                "count": len(values),
+                "mean_ms": sum(values) / len(values),
+                "p50_ms": percentile(values, 0.50),
+                "p95_ms": percentile(values, 0.95),
+                "p99_ms": percentile(values, 0.99),
+                "max_ms": max(values),
+            }
+            for stage, values in sorted(samples.items(), key=lambda item: order.get(item[0], len(order)))
+        }
+
+class ContinuousTrigger:
+    """Starts the next cycle as soon as the previous one finished"""
+    name = "continuous"
+
+    def arm(self, worker):
+        pass
+
+    def disarm(self, worker):
+        pass
+
+    def poll(self, worker):
+        return True
+
+class BenchmarkThread(AutoInspectionThread):
+    """Runs warmup plus `cycles` inspection cycles, then stops
+
+    Samples and verdicts from the warmup cycles are dropped. The error beep is
+    skipped, since it blocks the cycle for a second on Windows.
+    """
+
+    def __init__(self, plc, result_writer, model_service, capture, trigger, recorder, cycles, warmup):
+        super().__init__(plc, result_writer, model_service, capture, trigger, stage_observer=recorder)
+        self.recorder = recorder
+        self.cycles = cycles
+        self.warmup = warmup
+        self.completed = 0
+        self.frames_per_cycle = []
+        self.verdicts = {"YES": 0, "NO": 0}
+        self.measure_start = None
+        self.measure_end = None
+
+    def run_cycle(self):
+        if self.completed == self.warmup:
+            self.recorder.reset()
+            self.measure_start = time.perf_counter()
+        super().run_cycle()
+        self.completed += 1
+        if self.completed > self.warmup:
+            self.frames_per_cycle.append(self.frame_count)
+        if self.completed >= self.warmup + self.cycles:
+            self.measure_end = time.perf_counter()
+            self.running = False
+
+    def store_result(self, single, multiple, none, result):
+        super().store_result(single, multiple, none, result)
+        if self.completed >= self.warmup:
+            self.verdicts[result] += 1
+
+    def play_error_sound(self):
+        pass
+
+def peak_rss_bytes():
+    """Peak resident set size of this process, or None where it cannot be read"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                    "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                    ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except (AttributeError, OSError):
+        pass
+    return None
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def wait_until(condition, timeout=STARTUP_TIMEOUT):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def print_report(report):
+    print(f"{report['cycles']} cycles in {report['duration_s']:.1f}s: "
+          f"{report['cycles_per_minute']:.1f} cycles/min, "
+          f"{report['frames_per_cycle']['mean']:.1f} frames/cycle, "
+          f"peak RSS {report['peak_rss_mb'] or 0:.0f} MB, {report['errors']} errors")
+    print(f"{'stage':<14} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, stats in report["stages"].items():
+        print(f"{stage:<14} {stats['count']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}")
+    if "verdict_latency_p50_ms" in report["plc"]:
+        print(f"trigger to PLC verdict: p50 {report['plc']['verdict_latency_p50_ms']:.1f} ms, "
+              f"p95 {report['plc']['verdict_latency_p95_ms']:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inspection cycle on recorded footage")
+    parser.add_argument("--source", required=True,
+                        help="footage to replay: a video file, an image directory or a .npz frame archive")
+    parser.add_argument("--cycles", type=int, default=50, help="measured inspection cycles")
+    parser.add_argument("--warmup", type=int, default=1, help="cycles run before measuring")
+    parser.add_argument("--realtime", action="store_true",
+                        help="replay at the recorded frame rate instead of as fast as cycles take frames")
+    parser.add_argument("--weights", default=MODEL_PATH)
+    parser.add_argument("--backend", choices=sorted(INFERENCE_BACKENDS), default=INFERENCE_BACKEND)
+    parser.add_argument("--mysql-database",
+                        help="write results to this scratch MySQL database instead of a SQLite stand-in")
+    parser.add_argument("--plc-latency", type=float, default=0.0, help="seconds the simulator adds to every reply")
+    parser.add_argument("--plc-jitter", type=float, default=0.0, help="+/- seconds of random extra latency")
+    parser.add_argument("--trigger-interval", type=float, default=0.0,
+                        help="start cycles on a simulator trigger every this many seconds instead of back to back")
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--verbose", action="store_true", help="print the pipeline's log messages")
+    args = parser.parse_args()
+    if args.mysql_database == DB_CONFIG["database"]:
+        parser.error("use a scratch database, not the station's own")
+    if args.cycles < 1 or args.warmup < 0:
+        parser.error("--cycles must be at least 1 and --warmup not negative")
+
+    app = QCoreApplication(sys.argv[:1])
+    recorder = StageRecorder()
+    errors = []
+
+    def log(message, level="info"):
+        if args.verbose:
+            print(f"[{level.upper()}] {message}")
+
+    def fail(message):
+        errors.append(message)
+        print(f"[ERROR] {message}")
+
+    workdir = tempfile.mkdtemp(prefix="circlip-bench-")
+    db_pool = mysql_pool(args.mysql_database) if args.mysql_database else SqlitePool(
+        os.path.join(workdir, "results.db"))
+
+    triggered = args.trigger_interval > 0
+    simulator = PLCSimulator(port=0, latency=args.plc_latency, jitter=args.plc_jitter,
+                             trigger_register=PLC_TRIGGER_REGISTER if triggered else None,
+                             trigger_interval=args.trigger_interval, result_register=PLC_RESULT_REGISTER)
+    plc_port = simulator.start()
+
+    model_service = ModelService(args.weights, args.backend)
+    load_start = time.perf_counter()
+    model_service.load()
+    model_load_seconds = time.perf_counter() - load_start
+    if model_service.fallback_reason:
+        log(model_service.fallback_reason, "warning")
+
+    capture = CaptureThread(open_replay_source(args.source, realtime=args.realtime, loop=True))
+    result_writer = ResultWriter(db_pool, os.path.join(workdir, "spool.db"), stage_observer=recorder)
+    plc = PLCWorker("127.0.0.1", plc_port, stage_observer=recorder)
+    for worker in (capture, result_writer, plc):
+        worker.log_signal.connect(log)
+        worker.start()
+    if not wait_until(lambda: capture.connected):
+        fail(f"Could not open {args.source}")
+    if not wait_until(lambda: plc.connected, PLC_SOCKET_TIMEOUT * 2):
+        fail("PLC simulator did not accept the connection")
+
+    detection = BenchmarkThread(plc, result_writer, model_service, capture,
+                                PLCTrigger() if triggered else ContinuousTrigger(),
+                                recorder, args.cycles, args.warmup)
+    detection.log_signal.connect(log)
+    detection.error_signal.connect(fail)
+    detection.finished.connect(app.quit)
+    run_start = time.perf_counter()
+    detection.start()
+    app.exec_()
+
+    # Let the last results reach the database and the PLC before reading the samples
+    result_writer.stop()
+    plc.stop()
+    capture.stop()
+    simulator.stop()
+    db_pool.reset()
+    app.processEvents()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    measured_seconds = (detection.measure_end or time.perf_counter()) - (detection.measure_start or run_start)
+    frames = detection.frames_per_cycle or [0]
+    rss = peak_rss_bytes()
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "host": {
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+        },
+        "config": {
+            "source": args.source,
+            "realtime": args.realtime,
+            "weights": args.weights,
+            "backend": args.backend,
+            "fallback": model_service.fallback_reason,
+            "imgsz": model_service.imgsz,
+            "roi": model_service.roi.enabled,
+            "batch_size": INFERENCE_BATCH_SIZE,
+            "detection_window_s": DETECTION_WINDOW,
+            "early_exit": EARLY_EXIT_ENABLED,
+            "frame_diff_gating": FRAME_DIFF_GATING,
+            "database": f"mysql:{args.mysql_database}" if args.mysql_database else "sqlite",
+            "plc_latency_s": args.plc_latency,
+            "plc_jitter_s": args.plc_jitter,
+            "trigger_interval_s": args.trigger_interval,
+            "warmup_cycles": args.warmup,
+        },
+        "model_load_s": model_load_seconds,
+        "cycles": len(detection.frames_per_cycle),
+        "duration_s": measured_seconds,
+        "cycles_per_minute": len(detection.frames_per_cycle) / measured_seconds * 60 if measured_seconds else 0.0,
+        "frames_per_cycle": {
+            "mean": sum(frames) / len(frames),
+            "p50": percentile(frames, 0.50),
+            "min": min(frames),
+            "max": max(frames),
+        },
+        "verdicts": detection.verdicts,
+        "errors": len(errors),
+        "stages": recorder.summary(),
+        "peak_rss_mb": rss / 2 ** 20 if rss is not None else None,
+        "plc": simulator.summary(),
+    }
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Local stand-in for the Mitsubishi PLC, speaking MC protocol 3E binary frames
+
+Usage:
+    python plc_simulator.py [--port 1025] [--latency 0.005] [--jitter 0.002] [--drop-rate 0.01]
+                            [--trigger D0 --trigger-interval 3] [--log plc_writes.csv]
+
+Point PLC_HOST/PLC_PORT in ui2.py at it (e.g. 127.0.0.1). It answers the
+word and bit batch reads/writes rk_mcprotocol sends, holds the device memory
+in RAM, and can delay every reply, drop connections at random and raise the
+trigger register on a timer like a part arriving in the fixture. Every write
+is recorded with its timestamp; on exit the time from each trigger to the next
+write of --result-register (the verdict) is summarised.
+"""
+import argparse
+import csv
+import random
+import socketserver
+import struct
+import threading
+import time
+from datetime import datetime
+
+REQUEST_SUBHEADER = b'\x50\x00'
+RESPONSE_HEADER = b'\xd0\x00\x00\xff\xff\x03\x00'
+CMD_BATCH_READ = 0x0401
+CMD_BATCH_WRITE = 0x1401
+SUB_WORD = 0x0000
+SUB_BIT = 0x0001
+END_OK = 0x0000
+END_BAD_COMMAND = 0xC059
+END_BAD_DEVICE = 0xC05B
+END_BAD_LENGTH = 0xC061
+
+# Device code -> (name, number base used when printing the head device)
+DEVICES = {
+    0xA8: ('D', 10), 0x90: ('M', 10), 0x9C: ('X', 8), 0x9D: ('Y', 8), 0xB4: ('W', 16),
+    0xAF: ('R', 10), 0xA0: ('B', 16), 0x92: ('L', 10), 0x93: ('F', 10),
+}
+DEVICE_CODES = {name: code for code, (name, _) in DEVICES.items()}
+
+def device_name(code, address):
+    name, base = DEVICES[code]
+    digits = {8: f"{address:o}", 10: f"{address}", 16: f"{address:X}"}[base]
+    return f"{name}{digits}"
+
+def parse_register(register):
+    """'D0' -> (0xA8, 0); only decimal devices are accepted here"""
+    code = DEVICE_CODES[register[0].upper()]
+    return code, int(register[1:])
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+class PLCSimulator:
+    """MC protocol 3E server with fault injection, usable from scripts and the command line"""
+
+    def __init__(self, host="127.0.0.1", port=1025, latency=0.0, jitter=0.0, drop_rate=0.0,
+                 trigger_register=None, trigger_interval=0.0, result_register="D1", log_path=None,
+                 verbose=False):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = drop_rate
+        self.trigger = parse_register(trigger_register) if trigger_register else None
+        self.trigger_interval = trigger_interval
+        self.result = parse_register(result_register)
+        self.verbose = verbose
+        self.memory = {}  # (device code, address) -> word value (bits are stored as 0/1)
+        self.lock = threading.Lock()
+        self.writes = []  # (timestamp, client, device, values, ms since trigger or None)
+        self.trigger_time = None
+        self.triggers = 0
+        self.verdict_latencies = []  # seconds from trigger to the next result write
+        self.connections = 0
+        self.dropped = 0
+        self.log_file = open(log_path, "w", newline="") if log_path else None
+        self.log_writer = csv.writer(self.log_file) if self.log_file else None
+        if self.log_writer:
+            self.log_writer.writerow(["timestamp", "client", "device", "values", "ms_since_trigger"])
+        self.server = None
+        self.running = False
+
+    def start(self):
+        """Serve in background threads; returns the bound port (useful with port=0)"""
+        simulator = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                simulator.serve(self.request, f"{self.client_address[0]}:{self.client_address[1]}")
+
+        socketserver.ThreadingTCPServer.allow_reuse_address = True
+        self.server = socketserver.ThreadingTCPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.running = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        if self.trigger and self.trigger_interval > 0:
+            threading.Thread(target=self.run_trigger, daemon=True).start()
+        return self.port
+
+    def stop(self):
+        self.running = False
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.log_file:
+            self.log_file.close()
+
+    def run_trigger(self):
+        """Raise the trigger register every trigger_interval unless the last one is still unacknowledged"""
+        while self.running:
+            time.sleep(self.trigger_interval)
+            with self.lock:
+                if self.memory.get(self.trigger, 0):
+                    continue
+                self.memory[self.trigger] = 1
+                self.trigger_time = time.time()
+                self.triggers += 1
+            if self.verbose:
+                print(f"{datetime.now().isoformat(timespec='milliseconds')} trigger {device_name(*self.trigger)} = 1")
+
+    def recv_exact(self, conn, size):
+        data = b''
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                raise ConnectionResetError("client closed the connection")
+            data += chunk
+        return data
+
+    def serve(self, conn, client):
+        with self.lock:
+            self.connections += 1
+        if self.verbose:
+            print(f"{datetime.now().isoformat(timespec='milliseconds')} {client} connected")
+        try:
+            while self.running:
+                header = self.recv_exact(conn, 9)
+                if header[:2] != REQUEST_SUBHEADER:
+                    raise ConnectionError(f"not a 3E binary frame: {header.hex()}")
+                body = self.recv_exact(conn, struct.unpack('<H', header[7:9])[0])
+
+                if self.drop_rate and random.random() < self.drop_rate:
+                    with self.lock:
+                        self.dropped += 1
+                    if self.verbose:
+                        print(f"{datetime.now().isoformat(timespec='milliseconds')} {client} dropped")
+                    return
+
+                delay = self.latency + (random.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+                if delay > 0:
+                    time.sleep(delay)
+                conn.sendall(self.respond(header, body, client))
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            conn.close()
+
+    def respond(self, header, body, client):
+        if len(body) < 12:
+            return self.error_response(END_BAD_LENGTH, body)
+        command, subcommand = struct.unpack('<HH', body[2:6])
+        head = int.from_bytes(body[6:9], 'little')
+        code = body[9]
+        count = struct.unpack('<H', body[10:12])[0]
+        if code not in DEVICES:
+            return self.error_response(END_BAD_DEVICE, body)
+        if subcommand not in (SUB_WORD, SUB_BIT):
+            return self.error_response(END_BAD_COMMAND, body)
+
+        if command == CMD_BATCH_READ:
+            with self.lock:
+                values = [self.memory.get((code, head + i), 0) for i in range(count)]
+            if subcommand == SUB_WORD:
+                data = b''.join(struct.pack('<H', value & 0xFFFF) for value in values)
+            else:
+                data = self.pack_bits(values)
+            return self.ok_response(data)
+
+        if command == CMD_BATCH_WRITE:
+            payload = body[12:]
+            if subcommand == SUB_WORD:
+                if len(payload) != 2 * count:
+                    return self.error_response(END_BAD_LENGTH, body)
+                values = list(struct.unpack(f'<{count}H', payload))
+            else:
+                if len(payload) != (count + 1) // 2:
+                    return self.error_response(END_BAD_LENGTH, body)
+                values = self.unpack_bits(payload, count)
+            self.record_write(client, code, head, values)
+            return self.ok_response(b'')
+
+        return self.error_response(END_BAD_COMMAND, body)
+
+    @staticmethod
+    def pack_bits(values):
+        """Two bits per byte, high nibble first, as the 3E binary bit read returns them"""
+        if len(values) % 2:
+            values = values + [0]
+        return bytes((values[i] & 1) << 4 | (values[i + 1] & 1) for i in range(0, len(values), 2))
+
+    @staticmethod
+    def unpack_bits(payload, count):
+        bits = []
+        for byte in payload:
+            bits += [byte >> 4 & 1, byte & 1]
+        return bits[:count]
+
+    def ok_response(self, data):
+        return RESPONSE_HEADER + struct.pack('<HH', 2 + len(data), END_OK) + data
+
+    def error_response(self, end_code, body):
+        # End code followed by the error information block: network, PC, I/O, station, command, subcommand
+        info = b'\x00\xff\xff\x03\x00' + body[2:6].ljust(4, b'\x00')
+        return RESPONSE_HEADER + struct.pack('<HH', 2 + len(info), end_code) + info
+
+    def record_write(self, client, code, head, values):
+        now = time.time()
+        since_trigger = None
+        with self.lock:
+            for offset, value in enumerate(values):
+                self.memory[(code, head + offset)] = value
+            if self.trigger_time is not None:
+                since_trigger = (now - self.trigger_time) * 1000
+                if (code, head) == self.result:
+                    self.verdict_latencies.append(now - self.trigger_time)
+                    self.trigger_time = None
+            record = (now, client, device_name(code, head), values, since_trigger)
+            self.writes.append(record)
+            if self.log_writer:
+                self.log_writer.writerow([
+                    datetime.fromtimestamp(now).isoformat(timespec='milliseconds'), client, record[2],
+                    " ".join(str(value) for value in values),
+                    "" if since_trigger is None else f"{since_trigger:.1f}"])
+                self.log_file.flush()
+        if self.verbose:
+            suffix = "" if since_trigger is None else f" ({since_trigger:.1f} ms after trigger)"
+            print(f"{datetime.fromtimestamp(now).isoformat(timespec='milliseconds')} {client} "
+                  f"write {record[2]} = {values}{suffix}")
+
+    def summary(self):
+        """Counts and trigger-to-verdict latency percentiles in milliseconds"""
+        with self.lock:
+            latencies = [value * 1000 for value in self.verdict_latencies]
+            result = {
+                "connections": self.connections,
+                "dropped": self.dropped,
+                "writes": len(self.writes),
+                "triggers": self.triggers,
+                "verdicts": len(latencies),
+            }
+        if latencies:
+            result.update({
+                "verdict_latency_p50_ms": percentile(latencies, 0.50),
+                "verdict_latency_p95_ms": percentile(latencies, 0.95),
+                "verdict_latency_max_ms": max(latencies),
+            })
+        return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Local MC protocol (3E binary) PLC simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025, help="the station's PLC_PORT")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of random extra latency")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="probability that a request closes the connection instead of being answered")
+    parser.add_argument("--trigger", help="register raised to 1 every --trigger-interval, e.g. D0")
+    parser.add_argument("--trigger-interval", type=float, default=0.0, help="seconds between triggers")
+    parser.add_argument("--result-register", default="D1", help="verdict register timed against the trigger")
+    parser.add_argument("--log", help="CSV file recording every write")
+    parser.add_argument("--quiet", action="store_true", help="do not print each write")
+    args = parser.parse_args()
+
+    simulator = PLCSimulator(args.host, args.port, args.latency, args.jitter, args.drop_rate,
+                             args.trigger, args.trigger_interval, args.result_register, args.log,
+                             verbose=not args.quiet)
+    port = simulator.start()
+    print(f"PLC simulator listening on {args.host}:{port}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    simulator.stop()
+
+    for key, value in simulator.summary().items():
+        print(f"{key + ':':<24} {value:.1f}" if isinstance(value, float) else f"{key + ':':<24} {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Build the INT8 circlip model and check it against the FP32 best.pt
+
+Usage:
+    python quantize_model.py --frames saved_frames/ [--eval-frames other_frames/] [--mode static|dynamic]
+
+Frames are calibrated from the --frames folder. Agreement is measured on
+--eval-frames (defaults to the same folder). When a folder contains
+sub-folders, each sub-folder is treated as one inspection cycle; otherwise
+consecutive groups of --frames-per-cycle frames are. The resulting report is
+stored next to the weights and the "onnxruntime-int8" backend only loads the
+INT8 model while that report says the agreement thresholds were met for the
+current weights, inference size and ROI.
+"""
+import argparse
+import os
+import json
+from datetime import datetime
+import cv2
+from ui2 import (MODEL_PATH, SINGLE_PASS_PERCENT, QUANTIZATION_MIN_BOX_AGREEMENT,
+                 QUANTIZATION_MIN_VERDICT_AGREEMENT, UltralyticsBackend, OnnxRuntimeBackend,
+                 QuantizedOnnxBackend, ModelService)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+FRAMES_PER_CYCLE = 12
+
+def list_images(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.lower().endswith(IMAGE_EXTENSIONS))
+
+def load_cycles(folder, roi, frames_per_cycle=FRAMES_PER_CYCLE):
+    """Return a list of cycles, each a list of BGR frames cropped to the ROI"""
+    subfolders = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                        if os.path.isdir(os.path.join(folder, name)))
+    if subfolders:
+        groups = [list_images(sub) for sub in subfolders]
+    else:
+        paths = list_images(folder)
+        groups = [paths[i:i + frames_per_cycle] for i in range(0, len(paths), frames_per_cycle)]
+    cycles = []
+    for paths in groups:
+        frames = [roi.crop(frame) for frame in (cv2.imread(path) for path in paths) if frame is not None]
+        if frames:
+            cycles.append(frames)
+    return cycles
+
+class FrameCalibrationReader:
+    """Feeds saved frames to onnxruntime's static quantization calibrator"""
+
+    def __init__(self, frames, backend):
+        self.frames = iter(frames)
+        self.backend = backend
+
+    def get_next(self):
+        frame = next(self.frames, None)
+        if frame is None:
+            return None
+        batch, _ = self.backend.preprocess([frame])
+        return {self.backend.input_name: batch}
+
+def quantize(fp32_backend, int8_path, mode, calibration_frames):
+    """Write an INT8 copy of the FP32 ONNX model"""
+    from onnxruntime.quantization import quantize_dynamic, quantize_static, QuantType, QuantFormat
+
+    if mode == "dynamic":
+        quantize_dynamic(fp32_backend.artifact_path, int8_path, weight_type=QuantType.QUInt8)
+    else:
+        quantize_static(fp32_backend.artifact_path, int8_path,
+                        FrameCalibrationReader(calibration_frames, fp32_backend),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+def verdict(box_counts):
+    single = sum(1 for count in box_counts if count == 1)
+    return "YES" if single / len(box_counts) * 100 >= SINGLE_PASS_PERCENT else "NO"
+
+def compare(reference, candidate, cycles):
+    """Per-frame box-count and per-cycle verdict agreement of candidate versus reference"""
+    frames = matching_frames = matching_cycles = 0
+    for cycle in cycles:
+        reference_counts = [len(boxes) for boxes in reference.predict(cycle)]
+        candidate_counts = [len(boxes) for boxes in candidate.predict(cycle)]
+        frames += len(cycle)
+        matching_frames += sum(1 for a, b in zip(reference_counts, candidate_counts) if a == b)
+        matching_cycles += verdict(reference_counts) == verdict(candidate_counts)
+    return {
+        "frames": frames,
+        "cycles": len(cycles),
+        "box_count_agreement": matching_frames / frames,
+        "verdict_agreement": matching_cycles / len(cycles),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize the circlip model to INT8 and verify it against FP32")
+    parser.add_argument("--weights", default=MODEL_PATH)
+    parser.add_argument("--frames", required=True, help="folder of saved frames used for calibration")
+    parser.add_argument("--eval-frames", help="folder of saved frames used for the comparison")
+    parser.add_argument("--mode", choices=["static", "dynamic"], default="static")
+    parser.add_argument("--frames-per-cycle", type=int, default=FRAMES_PER_CYCLE)
+    args = parser.parse_args()
+
+    # Quantize and compare on exactly what the station feeds the model: ROI crops at its inference size
+    service = ModelService(args.weights)
+    calibration_cycles = load_cycles(args.frames, service.roi, args.frames_per_cycle)
+    eval_cycles = (load_cycles(args.eval_frames, service.roi, args.frames_per_cycle)
+                   if args.eval_frames else calibration_cycles)
+    if not calibration_cycles or not eval_cycles:
+        parser.error("no readable frames found")
+
+    fp32 = OnnxRuntimeBackend(args.weights, service.imgsz)
+    int8_path = QuantizedOnnxBackend.artifact_for(args.weights)
+    print(f"Quantizing {fp32.artifact_path} ({args.mode}) -> {int8_path}")
+    quantize(fp32, int8_path, args.mode, [frame for cycle in calibration_cycles for frame in cycle])
+
+    report = compare(UltralyticsBackend(args.weights, service.imgsz),
+                     OnnxRuntimeBackend(args.weights, service.imgsz, artifact_path=int8_path), eval_cycles)
+    report.update({
+        "mode": args.mode,
+        "weights_mtime": os.path.getmtime(args.weights),
+        "imgsz": service.imgsz,
+        "roi": service.roi.describe(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "passed": (report["box_count_agreement"] >= QUANTIZATION_MIN_BOX_AGREEMENT
+                   and report["verdict_agreement"] >= QUANTIZATION_MIN_VERDICT_AGREEMENT),
+    })
+    with open(QuantizedOnnxBackend.report_for(args.weights), "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Frames compared:     {report['frames']} in {report['cycles']} cycles")
+    print(f"Box-count agreement: {report['box_count_agreement']:.2%} (min {QUANTIZATION_MIN_BOX_AGREEMENT:.0%})")
+    print(f"Verdict agreement:   {report['verdict_agreement']:.2%} (min {QUANTIZATION_MIN_VERDICT_AGREEMENT:.0%})")
+    print("INT8 model enabled" if report["passed"] else "INT8 model NOT enabled - agreement too low")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,43 @@
 import sys
+import time
+# Taken before the heavy imports so --profile-startup can report their cost
+STARTUP_STARTED = time.perf_counter()
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QLabel, QPushButton, QTextEdit, QGroupBox, 
-                            QTableWidget, QTableWidgetItem, QHeaderView, QTabWidget, 
-                            QStatusBar, QFileDialog)
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QThread, QDate
-from PyQt5.QtGui import QPixmap, QImage, QIcon
+                            QTableView, QHeaderView, QTabWidget, 
+                            QStatusBar, QFileDialog, QProgressDialog, QTableWidget,
+                            QTableWidgetItem)
+from PyQt5.QtCore import (Qt, QTimer, pyqtSignal, QThread, QDate, QAbstractTableModel,
+                          QModelIndex)
+from PyQt5.QtGui import QPixmap, QImage, QIcon, QColor
 from PyQt5.QtMultimedia import QSound
 import cv2
-from ultralytics import YOLO
-import torch
 import mysql.connector  
 from mysql.connector import errorcode
 import rk_mcprotocol as mc
-import time
 import os
+import socket
+import hashlib
+import threading
+import queue
+import sqlite3
+from contextlib import contextmanager
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from io import BytesIO
-from PIL import Image
-import requests
 import numpy as np
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import winsound
 import csv
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
+import json
+import argparse
+
+# torch, ultralytics, reportlab, requests and PIL are imported where first used
+# so the window can appear before they load.
+STARTUP_IMPORTS_DONE = time.perf_counter()
 
 # Disable OpenMP issues for PyTorch
-torch.backends.openmp.enabled = False
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
 # Configuration
@@ -44,61 +54,2361 @@ PLC_HOST = '192.168.3.250'
 PLC_PORT = 1025
 LOGO_URL = "https://upload.wikimedia.org/wikipedia/commons/7/7f/Escorts_Kubota_Limited.jpg"
 TITLE_LOGO_URL = "https://encrypted-tbn0.gstatic.com/images?q=tbn:ANd9GcSxODT3mCalzwuNjjG27OI9ya_uPfebLhL7Sg&s"
+LOGO_CACHE_DIR = "logo_cache"       # logo.png / window_icon.png; ship them here for offline stations
+LOGO_FETCH_TIMEOUT = 5              # seconds per background logo download
 ALERT_SOUND_FILE = "alert.wav"
+MODEL_PATH = "yolov8training/exp1/weights/best.pt"
+WARMUP_FRAME_SIZE = (480, 640)
+INFERENCE_BACKEND = "onnxruntime"   # "ultralytics", "onnxruntime", "onnxruntime-int8" or "openvino"
+INFERENCE_IMGSZ = 640
+INFERENCE_THREADS = max(1, (os.cpu_count() or 2) - 1)   # leave a core for capture and the GUI
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7                 # ultralytics default, which the original predict() call used
+ROI_RECT = None                     # (x, y, width, height) of the fixture area, None for the full frame
+ROI_MASK_FILE = None                # optional mask image at camera resolution, non-zero = inspected
+ROI_INFERENCE_IMGSZ = 320           # inference size used when an ROI is configured
+QUANTIZATION_MIN_BOX_AGREEMENT = 0.97       # share of frames with the same box count as FP32
+QUANTIZATION_MIN_VERDICT_AGREEMENT = 1.0    # share of cycles with the same YES/NO as FP32
+CAPTURE_SOURCE = CAMERA_IND         # or RTSP_URL
+CAPTURE_RING_SIZE = 8
+CAPTURE_MAX_READ_FAILURES = 5
+CAPTURE_RECONNECT_DELAY = 2.0       # seconds
+REPLAY_IMAGE_FPS = 25.0             # frame rate assumed for image-directory replays
+FRAME_WAIT_TIMEOUT = 1.0            # seconds
+INFERENCE_BATCH_SIZE = 4            # frames per model call
+BATCH_MAX_WAIT = 0.15               # seconds to wait for a full batch
+DETECTION_WINDOW = 2.0              # seconds
+SINGLE_PASS_PERCENT = 60
+EARLY_EXIT_ENABLED = True
+EARLY_EXIT_Z = 2.576                # 99% two-sided confidence
+EARLY_EXIT_MIN_FRAMES = 8
+EARLY_EXIT_MAX_FRAMES = 120
+FRAME_DIFF_GATING = True            # reuses results only while EARLY_EXIT_ENABLED is False
+FRAME_DIFF_THRESHOLD = 2.0          # mean absolute grey-level change that counts as a new frame
+FRAME_DIFF_SIZE = (64, 48)          # downsampled size used for the comparison
+FRAME_DIFF_MAX_REUSE = 10           # force a fresh inference after this many reused frames
+AUTO_TRIGGER = "plc"                # "plc" or "presence"
+AUTO_MODE_ON_STARTUP = False        # arm hands-free inspection as soon as the UI starts
+AUTO_TRIGGER_POLL_INTERVAL = 0.05   # seconds
+PLC_TRIGGER_REGISTER = 'D0'         # PLC sets non-zero when a part is in position
+PLC_TRIGGER_ACK = True              # write 0 back once the trigger was seen
+PLC_RESULT_REGISTER = 'D1'          # verdict: 1 pass, 0 fail
+PLC_STATUS_WORDS = False            # also write D2 cycle count, D3 single % x10, D4 fault code after D1;
+                                    # only enable once those registers are free in the PLC program
+PLC_FAULT_NONE = 0
+PLC_FAULT_CAMERA = 1
+PLC_FAULT_NO_FRAMES = 2
+PLC_FAULT_ERROR = 3
+PLC_HEARTBEAT_INTERVAL = 0.05       # seconds between reads of PLC_TRIGGER_REGISTER (heartbeat and trigger)
+PLC_SOCKET_TIMEOUT = 2.0            # seconds for connect, send and receive
+PLC_RECONNECT_MAX_DELAY = 30.0      # seconds between reconnect attempts at most
+PRESENCE_THRESHOLD = 12.0           # mean grey-level difference from the empty fixture
+PRESENCE_SETTLE_FRAMES = 5          # still frames required before a part counts as arrived
+PRESENCE_REFERENCE_FILE = "empty_fixture.png"  # empty fixture taught with the Teach Empty button
+PREVIEW_FPS = 15
+PREVIEW_OVERLAY_HOLD = 2.0          # seconds detection boxes stay on the preview
+RESULT_SPOOL_FILE = "result_spool.db"   # local SQLite spool for results MySQL could not take
+RESULT_QUEUE_SIZE = 1000
+RESULT_BATCH_SIZE = 50
+RESULT_FLUSH_INTERVAL = 0.5         # seconds
+DB_RETRY_MAX_DELAY = 30.0           # seconds between reconnect attempts at most
+DB_POOL_SIZE = 5
+DB_ACQUIRE_TIMEOUT = 10.0           # seconds to wait for a free pooled connection
+DB_HEALTH_CHECK_INTERVAL = 30.0     # idle seconds after which a pooled connection is pinged
+TABLE_PAGE_SIZE = 200               # rows fetched from MySQL per page as a table scrolls
+TABLE_CACHED_PAGES = 10             # pages kept in memory per table; older ones are re-read on demand
+CSV_EXPORT_CHUNK = 1000             # rows streamed from MySQL per fetch while exporting
+PDF_TABLE_CHUNK = 35                # report rows per reportlab Table, about one letter page
+METRICS_BUCKETS = tuple(float(f"{0.0001 * 10 ** (i / 8):.3g}") for i in range(45))  # 0.1 ms to 32 s, ~33% apart
+METRICS_WINDOW = 60.0               # seconds covered by the rolling percentiles in the Metrics tab
+METRICS_WINDOW_SLICES = 6           # the window moves on in steps of METRICS_WINDOW / METRICS_WINDOW_SLICES
+METRICS_REFRESH_INTERVAL = 1.0      # seconds between Metrics tab updates
+METRICS_HTTP_HOST = "127.0.0.1"
+METRICS_HTTP_PORT = 9109            # Prometheus text format at /metrics; None disables the endpoint
+
+class UltralyticsBackend:
+    """PyTorch inference through ultralytics; always available as the fallback"""
+    name = "ultralytics"
+
+    def __init__(self, weights_path, imgsz=INFERENCE_IMGSZ):
+        import torch
+        from ultralytics import YOLO
+        torch.backends.openmp.enabled = False
+        
+        self.imgsz = imgsz
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        if self.device == "cpu":
+            torch.set_num_threads(INFERENCE_THREADS)
+        self.model = YOLO(weights_path)
+        self.model.to(self.device)
+
+    def predict(self, frames):
+        """Return one (N, 6) array of x1, y1, x2, y2, conf, cls per frame"""
+        results = self.model.predict(frames, imgsz=self.imgsz, conf=CONF_THRESHOLD, iou=IOU_THRESHOLD,
+                                     device=self.device, verbose=False)
+        return [result.boxes.data.cpu().numpy() for result in results]
+
+class ExportedModelBackend:
+    """Shared pre/post-processing for YOLOv8 models exported from best.pt
+
+    The exported artifact is cached next to the weights and only re-exported
+    when best.pt is newer than it.
+    """
+    name = None
+    export_format = None
+    fallback = UltralyticsBackend.name
+
+    def __init__(self, weights_path, imgsz=INFERENCE_IMGSZ, artifact_path=None):
+        self.imgsz = imgsz
+        self.artifact_path = artifact_path or self.export(weights_path)
+
+    @classmethod
+    def artifact_for(cls, weights_path):
+        raise NotImplementedError
+
+    def export(self, weights_path):
+        """Export the weights once and reuse the cached artifact afterwards"""
+        artifact = self.artifact_for(weights_path)
+        if os.path.exists(artifact) and os.path.getmtime(artifact) >= os.path.getmtime(weights_path):
+            return artifact
+        from ultralytics import YOLO
+        YOLO(weights_path).export(format=self.export_format, imgsz=self.imgsz, dynamic=True)
+        if not os.path.exists(artifact):
+            raise RuntimeError(f"{self.export_format} export did not produce {artifact}")
+        return artifact
+
+    def letterbox(self, frame):
+        """Resize keeping the aspect ratio and pad to a square imgsz input"""
+        h, w = frame.shape[:2]
+        scale = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (self.imgsz - new_w) // 2, (self.imgsz - new_h) // 2
+        canvas = np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(frame, (new_w, new_h),
+                                                                      interpolation=cv2.INTER_LINEAR)
+        return canvas, scale, pad_x, pad_y
+
+    def preprocess(self, frames):
+        batch = np.empty((len(frames), 3, self.imgsz, self.imgsz), dtype=np.float32)
+        transforms = []
+        for i, frame in enumerate(frames):
+            canvas, scale, pad_x, pad_y = self.letterbox(frame)
+            # BGR HWC uint8 -> RGB CHW float in [0, 1]
+            batch[i] = canvas[:, :, ::-1].transpose(2, 0, 1)
+            transforms.append((scale, pad_x, pad_y, frame.shape[1], frame.shape[0]))
+        batch /= 255.0
+        return batch, transforms
+
+    def postprocess(self, output, transforms):
+        """Decode the raw (B, 4 + classes, anchors) output with per-class NMS"""
+        detections = []
+        for pred, (scale, pad_x, pad_y, width, height) in zip(output, transforms):
+            pred = pred.T
+            scores = pred[:, 4:]
+            cls = scores.argmax(axis=1)
+            conf = scores[np.arange(len(cls)), cls]
+            keep = conf > CONF_THRESHOLD
+            if not keep.any():
+                detections.append(np.zeros((0, 6), dtype=np.float32))
+                continue
+            xywh, conf, cls = pred[keep, :4], conf[keep], cls[keep]
+
+            # Offset boxes by class so NMS never suppresses across classes
+            offset = (cls * self.imgsz * 2)[:, None]
+            nms_boxes = np.concatenate([xywh[:, :2] - xywh[:, 2:] / 2 + offset, xywh[:, 2:]], axis=1)
+            idx = np.array(cv2.dnn.NMSBoxes(nms_boxes.tolist(), conf.tolist(),
+                                            CONF_THRESHOLD, IOU_THRESHOLD), dtype=int).reshape(-1)
+
+            xyxy = np.concatenate([xywh[idx, :2] - xywh[idx, 2:] / 2, xywh[idx, :2] + xywh[idx, 2:] / 2], axis=1)
+            xyxy -= (pad_x, pad_y, pad_x, pad_y)
+            xyxy /= scale
+            xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+            xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+            detections.append(np.concatenate([xyxy, conf[idx, None], cls[idx, None]], axis=1).astype(np.float32))
+        return detections
+
+    def infer(self, batch):
+        raise NotImplementedError
+
+    def predict(self, frames):
+        """Return one (N, 6) array of x1, y1, x2, y2, conf, cls per frame"""
+        if isinstance(frames, np.ndarray):
+            frames = [frames]
+        batch, transforms = self.preprocess(frames)
+        return self.postprocess(self.infer(batch), transforms)
+
+class OnnxRuntimeBackend(ExportedModelBackend):
+    """ONNX export run through onnxruntime on the CPU"""
+    name = "onnxruntime"
+    export_format = "onnx"
+
+    def __init__(self, weights_path, imgsz=INFERENCE_IMGSZ, artifact_path=None):
+        import onnxruntime as ort
+        super().__init__(weights_path, imgsz, artifact_path)
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = INFERENCE_THREADS
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.artifact_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    @classmethod
+    def artifact_for(cls, weights_path):
+        return os.path.splitext(weights_path)[0] + ".onnx"
+
+    def infer(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+class QuantizedOnnxBackend(OnnxRuntimeBackend):
+    """INT8 model built by quantize_model.py, used only while its accuracy check holds"""
+    name = "onnxruntime-int8"
+    fallback = OnnxRuntimeBackend.name
+
+    @classmethod
+    def artifact_for(cls, weights_path):
+        return os.path.splitext(weights_path)[0] + ".int8.onnx"
+
+    @classmethod
+    def report_for(cls, weights_path):
+        return os.path.splitext(weights_path)[0] + ".int8.json"
+
+    def export(self, weights_path):
+        """Check the stored FP32 comparison instead of exporting"""
+        artifact = self.artifact_for(weights_path)
+        report_path = self.report_for(weights_path)
+        if not os.path.exists(artifact) or not os.path.exists(report_path):
+            raise RuntimeError("no INT8 model, run quantize_model.py first")
+        with open(report_path) as f:
+            report = json.load(f)
+        if report.get("weights_mtime") != os.path.getmtime(weights_path):
+            raise RuntimeError("INT8 model is older than best.pt, run quantize_model.py again")
+        # The agreement only holds for the input it was measured on
+        if report.get("imgsz") != self.imgsz:
+            raise RuntimeError(f"INT8 model was checked at imgsz {report.get('imgsz')}, not {self.imgsz}, "
+                               "run quantize_model.py again")
+        if report.get("roi") != RegionOfInterest().describe():
+            raise RuntimeError("INT8 model was checked with a different ROI, run quantize_model.py again")
+        if not report.get("passed"):
+            raise RuntimeError(
+                f"INT8 model failed the accuracy check (box agreement {report['box_count_agreement']:.1%}, "
+                f"verdict agreement {report['verdict_agreement']:.1%})")
+        return artifact
+
+class OpenVINOBackend(ExportedModelBackend):
+    """OpenVINO IR export compiled for the CPU"""
+    name = "openvino"
+    export_format = "openvino"
+
+    def __init__(self, weights_path, imgsz=INFERENCE_IMGSZ, artifact_path=None):
+        import openvino as ov
+        super().__init__(weights_path, imgsz, artifact_path)
+        core = ov.Core()
+        self.compiled = core.compile_model(core.read_model(self.artifact_path), "CPU",
+                                           {"INFERENCE_NUM_THREADS": INFERENCE_THREADS})
+        self.output = self.compiled.output(0)
+
+    @classmethod
+    def artifact_for(cls, weights_path):
+        stem = os.path.splitext(weights_path)[0]
+        return os.path.join(f"{stem}_openvino_model", os.path.basename(stem) + ".xml")
+
+    def infer(self, batch):
+        return self.compiled(batch)[self.output]
+
+INFERENCE_BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    QuantizedOnnxBackend.name: QuantizedOnnxBackend,
+    OpenVINOBackend.name: OpenVINOBackend,
+}
+
+class RegionOfInterest:
+    """Fixed fixture region that is cropped out of every frame before inference
+
+    Configured with ROI_RECT and/or ROI_MASK_FILE. With only a mask, its bounding
+    box is used as the rectangle; pixels outside the mask are filled with the
+    letterbox grey so they cannot produce detections.
+    """
+    FILL_VALUE = 114
+
+    def __init__(self, rect=ROI_RECT, mask_file=ROI_MASK_FILE):
+        self.rect = tuple(rect) if rect else None
+        self.mask = None
+        if mask_file:
+            mask = cv2.imread(mask_file, cv2.IMREAD_GRAYSCALE)
+            if mask is None:
+                raise ValueError(f"Could not read ROI mask {mask_file}")
+            self.mask = mask > 0
+            if self.rect is None:
+                self.rect = cv2.boundingRect(self.mask.astype(np.uint8))
+
+    @property
+    def enabled(self):
+        return self.rect is not None
+
+    def describe(self):
+        """JSON-friendly identity of the rectangle and mask, to tell whether a check used this ROI"""
+        mask = None
+        if self.mask is not None:
+            mask = hashlib.sha1(str(self.mask.shape).encode() + np.packbits(self.mask).tobytes()).hexdigest()
+        return {"rect": [int(value) for value in self.rect] if self.rect else None, "mask": mask}
+
+    def bounds(self, shape):
+        """ROI rectangle clipped to a frame of the given shape as (x0, y0, x1, y1)"""
+        h, w = shape[:2]
+        x, y, rw, rh = self.rect
+        return max(x, 0), max(y, 0), min(x + rw, w), min(y + rh, h)
+
+    def crop(self, frame):
+        if not self.enabled:
+            return frame
+        x0, y0, x1, y1 = self.bounds(frame.shape)
+        crop = frame[y0:y1, x0:x1]
+        if self.mask is not None:
+            mask = self.mask
+            if mask.shape != frame.shape[:2]:
+                mask = cv2.resize(mask.astype(np.uint8), (frame.shape[1], frame.shape[0]),
+                                  interpolation=cv2.INTER_NEAREST) > 0
+            crop = crop.copy()
+            crop[~mask[y0:y1, x0:x1]] = self.FILL_VALUE
+        return crop
+
+    def to_frame(self, boxes, frame):
+        """Map boxes from crop coordinates back to full-frame coordinates"""
+        if not self.enabled or len(boxes) == 0:
+            return boxes
+        x0, y0, _, _ = self.bounds(frame.shape)
+        boxes = boxes.copy()
+        boxes[:, [0, 2]] += x0
+        boxes[:, [1, 3]] += y0
+        return boxes
+
+class ModelService:
+    """Long-lived YOLO model shared by every detection cycle"""
+
+    def __init__(self, weights_path=MODEL_PATH, backend=INFERENCE_BACKEND, roi=None):
+        self.weights_path = weights_path
+        self.backend_name = backend
+        self.roi = roi if roi is not None else RegionOfInterest()
+        self.imgsz = ROI_INFERENCE_IMGSZ if self.roi.enabled else INFERENCE_IMGSZ
+        self.backend = None
+        self.fallback_reason = None
+        self.loaded_mtime = None
+        self.failed_mtime = None  # weights that failed to reload, not retried until they change
+        self.reload_thread = None
+        self.lock = threading.Lock()
+        # Serialises loads, so a cycle started during the startup warm-up waits for it
+        self.load_lock = threading.RLock()
+
+    def create_backend(self):
+        """Build the configured backend, walking its fallbacks down to the ultralytics PyTorch path"""
+        self.fallback_reason = None
+        name = self.backend_name
+        reasons = []
+        while name != UltralyticsBackend.name:
+            backend_class = INFERENCE_BACKENDS[name]
+            try:
+                backend = backend_class(self.weights_path, self.imgsz)
+                break
+            except Exception as e:
+                reasons.append(f"{name} backend unavailable ({e})")
+                name = backend_class.fallback
+        else:
+            backend = UltralyticsBackend(self.weights_path, self.imgsz)
+
+        if reasons:
+            self.fallback_reason = f"{'; '.join(reasons)}, using {name}"
+        return backend
+
+    def load(self):
+        """Load the weights from disk and warm the model up"""
+        with self.load_lock:
+            mtime = os.path.getmtime(self.weights_path)
+            backend = self.create_backend()
+            self.warm_up(backend)
+
+            # Swap only once the new model is ready so running cycles are not blocked
+            with self.lock:
+                self.backend = backend
+                self.loaded_mtime = mtime
+
+    def warm_up(self, backend):
+        """Run one inference on a dummy frame so the first real cycle is not slow"""
+        dummy = np.zeros((*WARMUP_FRAME_SIZE, 3), dtype=np.uint8)
+        backend.predict([self.roi.crop(dummy)])
+
+    def is_loaded(self):
+        """Check whether a model is ready for inference"""
+        return self.backend is not None
+
+    def weights_changed(self):
+        """Check whether the weights file on disk differs from the loaded one"""
+        try:
+            return os.path.getmtime(self.weights_path) != self.loaded_mtime
+        except OSError:
+            return False
+
+    def reload_if_changed(self):
+        """Reload the model when the weights file was replaced; returns True on reload"""
+        if self.is_loaded() and not self.weights_changed():
+            return False
+        with self.load_lock:
+            # Another thread may have finished loading while we waited
+            if self.is_loaded() and not self.weights_changed():
+                return False
+            self.load()
+        return True
+
+    def reload_in_background(self, report):
+        """Reload replaced weights on a worker thread while cycles keep using the loaded model
+
+        report(message, level) is called from the worker when it is done. A file
+        that fails to load is reported once and not retried until it changes
+        again. Without any model loaded there is nothing to fall back on, so the
+        load happens inline and raises. Returns True when a reload was started.
+        """
+        if not self.is_loaded():
+            return self.reload_if_changed()
+        try:
+            mtime = os.path.getmtime(self.weights_path)
+        except OSError:
+            return False
+        if mtime in (self.loaded_mtime, self.failed_mtime):
+            return False
+        with self.lock:
+            if self.reload_thread is not None and self.reload_thread.is_alive():
+                return False
+            self.reload_thread = threading.Thread(target=self.background_reload, args=(mtime, report),
+                                                  daemon=True)
+            self.reload_thread.start()
+        return True
+
+    def background_reload(self, mtime, report):
+        try:
+            self.load()
+        except Exception as e:
+            self.failed_mtime = mtime
+            report(f"Model reload failed, keeping the loaded model: {e}", "error")
+            return
+        if self.fallback_reason:
+            report(self.fallback_reason, "warning")
+        report(f"YOLO model reloaded from disk ({self.backend.name})", "info")
+
+    def predict(self, frames):
+        """Run a list of frames through the backend as one batch; boxes are in frame coordinates"""
+        with self.lock:
+            backend = self.backend
+        results = backend.predict([self.roi.crop(frame) for frame in frames])
+        return [self.roi.to_frame(boxes, frame) for boxes, frame in zip(results, frames)]
+
+class FrameRingBuffer:
+    """Preallocated ring of the newest camera frames
+
+    The writer fills the oldest slot in place and then publishes it, so readers
+    only ever copy slots that are not being written. In lossless mode (replays
+    at maximum speed) the writer waits instead of overwriting frames that
+    wait_frames has not handed out yet, and wait_frames returns the oldest
+    unread frames rather than the newest.
+    """
+
+    def __init__(self, size=CAPTURE_RING_SIZE, lossless=False):
+        self.size = size
+        self.lossless = lossless
+        self.frames = None
+        self.timestamps = np.zeros(size)
+        self.seq = 0  # number of frames published so far
+        self.consumed = 0  # lossless mode: frames handed out by wait_frames so far
+        self.condition = threading.Condition()
+
+    def wait_for_space(self, timeout):
+        """Lossless mode: wait until the next slot may be overwritten; returns False on timeout"""
+        if not self.lossless:
+            return True
+        with self.condition:
+            return self.condition.wait_for(lambda: self.seq - self.consumed < self.size - 1, timeout)
+
+    def start_reading(self):
+        """(seq, capture time of that frame or None) a new inspection cycle should read after
+
+        Live frames are only evaluated from the start of the cycle; a lossless
+        replay continues with the first frame nobody has read yet.
+        """
+        with self.condition:
+            seq = self.consumed if self.lossless else self.seq
+            return seq, (self.timestamps[(seq - 1) % self.size] if seq else None)
+
+    def next_slot(self):
+        """Buffer the writer should fill next"""
+        if self.frames is None:
+            return None
+        return self.frames[self.seq % self.size]
+
+    def publish(self, frame=None, timestamp=None):
+        """Mark the next slot as written; copy `frame` in if it was read elsewhere"""
+        with self.condition:
+            if frame is not None:
+                if self.frames is None or self.frames.shape[1:] != frame.shape:
+                    self.frames = np.empty((self.size, *frame.shape), dtype=frame.dtype)
+                np.copyto(self.frames[self.seq % self.size], frame)
+            self.timestamps[self.seq % self.size] = time.time() if timestamp is None else timestamp
+            self.seq += 1
+            self.condition.notify_all()
+
+    def latest(self, after_seq=0):
+        """Return (seq, frame copy) of the newest frame newer than after_seq, without blocking"""
+        with self.condition:
+            if self.seq <= after_seq or self.frames is None:
+                return after_seq, None
+            return self.seq, self.frames[(self.seq - 1) % self.size].copy()
+
+    def wait_frames(self, after_seq, max_count, timeout=FRAME_WAIT_TIMEOUT):
+        """Wait up to `timeout` seconds for frames newer than after_seq
+
+        Returns (seq, copies of up to max_count of the newest such frames, oldest
+        first, and their capture times).
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > after_seq, timeout)
+            if self.seq <= after_seq or self.frames is None:
+                return after_seq, [], []
+            if self.lossless:
+                first = max(after_seq, self.seq - (self.size - 1))
+                last = first + min(self.seq - first, max_count)
+                self.consumed = max(self.consumed, last)
+                self.condition.notify_all()
+            else:
+                # The slot after the newest one may be mid-write, so never hand it out
+                last = self.seq
+                first = last - min(self.seq - after_seq, max_count, self.size - 1)
+            frames = [self.frames[seq % self.size].copy() for seq in range(first, last)]
+            timestamps = [self.timestamps[seq % self.size] for seq in range(first, last)]
+            return last, frames, timestamps
+
+class ReplaySource:
+    """Recorded footage played through the capture pipeline in place of the camera
+
+    Has the read()/isOpened()/release() interface of cv2.VideoCapture that
+    CaptureThread uses. With `realtime` frames are paced at their recorded
+    rate; otherwise they come as fast as inspection cycles take them, and
+    CaptureThread switches its ring to lossless mode so none are skipped.
+    Subclasses implement rewind() and next_frame().
+    """
+
+    def __init__(self, path, realtime=True, loop=False):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.finished = False
+        self.timestamp = None  # capture time of the last frame read
+        self.started = None
+
+    def open(self):
+        """Start from the first frame; returns False when the footage cannot be read"""
+        self.finished = False
+        self.started = time.time()
+        return self.rewind()
+
+    def rewind(self):
+        raise NotImplementedError
+
+    def next_frame(self, image=None):
+        """Return (frame, seconds since the first frame), or (None, None) at the end"""
+        raise NotImplementedError
+
+    def isOpened(self):
+        return self.started is not None
+
+    def read(self, image=None):
+        frame, media_time = self.next_frame(image)
+        if frame is None and self.loop and self.rewind():
+            # Keep timestamps increasing across loops
+            self.started = self.timestamp if self.timestamp is not None else time.time()
+            frame, media_time = self.next_frame(image)
+        if frame is None:
+            self.finished = True
+            return False, None
+
+        self.timestamp = self.started + media_time
+        if self.realtime:
+            delay = self.timestamp - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        if image is not None and frame is not image and image.shape == frame.shape:
+            np.copyto(image, frame)
+            frame = image
+        return True, frame
+
+    def release(self):
+        self.started = None
+
+class VideoFileSource(ReplaySource):
+    """Replays a video file using its own frame timestamps"""
+
+    def __init__(self, path, realtime=True, loop=False):
+        super().__init__(path, realtime, loop)
+        self.cap = None
+
+    def rewind(self):
+        if self.cap is not None:
+            self.cap.release()
+        self.cap = cv2.VideoCapture(self.path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or REPLAY_IMAGE_FPS
+        self.index = 0
+        return self.cap.isOpened()
+
+    def next_frame(self, image=None):
+        ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+        if not ret:
+            return None, None
+        self.index += 1
+        return frame, (self.index - 1) / self.fps
+
+    def release(self):
+        super().release()
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+class ImageDirectorySource(ReplaySource):
+    """Replays the images of a directory in file-name order at REPLAY_IMAGE_FPS"""
+    EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, path, realtime=True, loop=False, fps=REPLAY_IMAGE_FPS):
+        super().__init__(path, realtime, loop)
+        self.fps = fps
+
+    def rewind(self):
+        self.paths = sorted(os.path.join(self.path, name) for name in os.listdir(self.path)
+                            if name.lower().endswith(self.EXTENSIONS))
+        self.index = 0
+        return bool(self.paths)
+
+    def next_frame(self, image=None):
+        while self.index < len(self.paths):
+            self.index += 1
+            frame = cv2.imread(self.paths[self.index - 1])
+            if frame is not None:
+                return frame, (self.index - 1) / self.fps
+        return None, None
+
+class FrameArchiveSource(ReplaySource):
+    """Replays a frame archive: an .npz with `frames` (N, H, W, 3) BGR and `timestamps` (N,) seconds"""
+
+    def rewind(self):
+        with np.load(self.path) as archive:
+            self.frames = archive['frames']
+            timestamps = archive['timestamps'] if 'timestamps' in archive else np.arange(len(self.frames)) / REPLAY_IMAGE_FPS
+        self.offsets = np.asarray(timestamps, dtype=np.float64) - (timestamps[0] if len(timestamps) else 0)
+        self.index = 0
+        return len(self.frames) > 0
+
+    def next_frame(self, image=None):
+        if self.index >= len(self.frames):
+            return None, None
+        self.index += 1
+        return self.frames[self.index - 1], float(self.offsets[self.index - 1])
+
+    @staticmethod
+    def write(path, frames, timestamps):
+        """Save frames and their capture times (seconds) as an archive this source can replay"""
+        np.savez(path, frames=np.asarray(frames), timestamps=np.asarray(timestamps, dtype=np.float64))
+
+def open_replay_source(path, realtime=True, loop=False):
+    """Pick the replay source for a video file, an image directory or a .npz frame archive"""
+    if os.path.isdir(path):
+        return ImageDirectorySource(path, realtime, loop)
+    if path.lower().endswith(".npz"):
+        return FrameArchiveSource(path, realtime, loop)
+    return VideoFileSource(path, realtime, loop)
+
+class CaptureThread(QThread):
+    """Keeps the camera open and feeds the frame ring for the life of the UI
+
+    `source` is a camera index or stream URL, or a ReplaySource.
+    """
+    log_signal = pyqtSignal(str, str)
+    status_signal = pyqtSignal(bool)
+
+    def __init__(self, source=CAPTURE_SOURCE, ring_size=CAPTURE_RING_SIZE):
+        super().__init__()
+        self.source = source
+        self.replay = isinstance(source, ReplaySource)
+        self.ring = FrameRingBuffer(ring_size, lossless=self.replay and not source.realtime)
+        self.running = True
+        self.connected = False
+
+    def open_camera(self):
+        """Open the configured device or stream, or return None"""
+        if self.replay:
+            return self.source if self.source.open() else None
+        cap = cv2.VideoCapture(self.source)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        return cap
+
+    def set_connected(self, connected):
+        if connected != self.connected:
+            self.connected = connected
+            self.status_signal.emit(connected)
+
+    def run(self):
+        cap = None
+        failures = 0
+        open_error_logged = False
+        while self.running:
+            if cap is None:
+                cap = self.open_camera()
+                if cap is None:
+                    self.set_connected(False)
+                    if not open_error_logged:
+                        self.log_signal.emit("Could not open camera feed, retrying...", "error")
+                        open_error_logged = True
+                    self.msleep(int(CAPTURE_RECONNECT_DELAY * 1000))
+                    continue
+                self.set_connected(True)
+                self.log_signal.emit("Camera opened", "info")
+                open_error_logged = False
+                failures = 0
+
+            if not self.ring.wait_for_space(0.1):
+                continue
+            slot = self.ring.next_slot()
+            ret, frame = cap.read(slot) if slot is not None else cap.read()
+            if not ret and self.replay and self.source.finished:
+                self.log_signal.emit("Replay finished", "info")
+                break
+            if not ret:
+                failures += 1
+                if failures >= CAPTURE_MAX_READ_FAILURES:
+                    self.log_signal.emit("Camera read failed, reconnecting...", "warning")
+                    cap.release()
+                    cap = None
+                    self.set_connected(False)
+                continue
+
+            failures = 0
+            # cap.read() allocates a new array when the slot shape does not match
+            self.ring.publish(None if frame is slot else frame, self.source.timestamp if self.replay else None)
+
+        if cap is not None:
+            cap.release()
+        self.set_connected(False)
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+class EarlyExitRule:
+    """Ends a cycle once the YES/NO verdict can no longer change
+
+    Uses the Wilson score interval on the single-circlip ratio: when the whole
+    interval lies on one side of the pass threshold the verdict is certain.
+    The same per-frame tallies feed the interval and the final verdict. Early
+    exit never happens before min_frames, and max_frames is a hard cap.
+    """
+
+    def __init__(self, threshold=SINGLE_PASS_PERCENT / 100, z=EARLY_EXIT_Z,
+                 min_frames=EARLY_EXIT_MIN_FRAMES, max_frames=EARLY_EXIT_MAX_FRAMES,
+                 enabled=EARLY_EXIT_ENABLED):
+        self.threshold = threshold
+        self.z = z
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.enabled = enabled
+
+    def confidence_bounds(self, single, total):
+        """Wilson score interval for the single-circlip ratio"""
+        if total == 0:
+            return 0.0, 1.0
+        p = single / total
+        z2 = self.z * self.z
+        denom = 1 + z2 / total
+        center = (p + z2 / (2 * total)) / denom
+        margin = self.z * np.sqrt(p * (1 - p) / total + z2 / (4 * total * total)) / denom
+        return center - margin, center + margin
+
+    def is_certain(self, single, total):
+        """Check whether the interval lies entirely on one side of the threshold"""
+        low, high = self.confidence_bounds(single, total)
+        return low >= self.threshold or high < self.threshold
+
+    def remaining(self, total):
+        """Frames that may still be evaluated before the hard cap"""
+        return max(self.max_frames - total, 0)
+
+    def should_stop(self, single, total):
+        """Decide whether the cycle can end after `total` evaluated frames"""
+        if total >= self.max_frames:
+            return True
+        return self.enabled and total >= self.min_frames and self.is_certain(single, total)
+
+class FrameChangeGate:
+    """Reuses the previous detection for frames nearly identical to the last inferred one
+
+    Frames are compared on a small greyscale thumbnail of the ROI, so the check
+    costs a fraction of a model pass.
+    """
+
+    def __init__(self, roi, enabled=FRAME_DIFF_GATING, threshold=FRAME_DIFF_THRESHOLD,
+                 size=FRAME_DIFF_SIZE, max_reuse=FRAME_DIFF_MAX_REUSE):
+        self.roi = roi
+        self.enabled = enabled
+        self.threshold = threshold
+        self.size = size
+        self.max_reuse = max_reuse
+        self.reset()
+
+    def reset(self):
+        """Forget the reference frame so the next frame is always inferred"""
+        self.reference = None
+        self.last_boxes = None
+        self.reuse_count = 0
+
+    def thumbnail(self, frame):
+        small = cv2.resize(self.roi.crop(frame), self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def needs_inference(self, thumb):
+        if self.reference is None or self.reuse_count >= self.max_reuse:
+            return True
+        return cv2.absdiff(thumb, self.reference).mean() >= self.threshold
+
+    def plan(self, frames, reuse=True):
+        """Split a batch into the frames to infer and, per frame, which inferred result it uses
+
+        Returns (frames_to_infer, sources) where sources[i] is an index into the
+        inferred results or None to reuse the result before it. With reuse=False
+        every frame is inferred.
+        """
+        if not self.enabled or not reuse:
+            return frames, list(range(len(frames)))
+        to_infer, sources = [], []
+        for frame in frames:
+            thumb = self.thumbnail(frame)
+            if self.needs_inference(thumb):
+                self.reference = thumb
+                self.reuse_count = 0
+                to_infer.append(frame)
+                sources.append(len(to_infer) - 1)
+            else:
+                self.reuse_count += 1
+                sources.append(None)
+        return to_infer, sources
+
+    def expand(self, inferred, sources):
+        """Build one result per original frame from the inferred results"""
+        results = []
+        for source in sources:
+            if source is not None:
+                self.last_boxes = inferred[source]
+            results.append(self.last_boxes)
+        return results
+
+def frame_to_qimage(frame, boxes=None, roi=None, size=None):
+    """Convert a BGR frame to an RGB QImage that owns its pixels
+
+    The frame is downscaled to fit `size` first and the ROI outline and boxes
+    are drawn at the output scale, so only the small image is ever converted.
+    """
+    h, w = frame.shape[:2]
+    scale = 1.0
+    if size is not None:
+        scale = min(size[0] / w, size[1] / h, 1.0)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (max(int(w * scale), 1), max(int(h * scale), 1)),
+                               interpolation=cv2.INTER_AREA)
+    image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    if roi is not None and roi.enabled:
+        x0, y0, x1, y1 = (np.array(roi.bounds((h, w))) * scale).astype(int)
+        cv2.rectangle(image, (x0, y0), (x1, y1), (255, 255, 0), 1)
+    if boxes is not None:
+        color = (0, 255, 0) if len(boxes) == 1 else (255, 0, 0)
+        for x1, y1, x2, y2 in (boxes[:, :4] * scale).astype(int):
+            cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
+
+    out_h, out_w = image.shape[:2]
+    # copy() detaches the QImage from the numpy buffer, which is reused afterwards
+    return QImage(image.data, out_w, out_h, image.strides[0], QImage.Format_RGB888).copy()
+
+class PreviewThread(QThread):
+    """Feeds the camera label at a capped frame rate, independently of detection
+
+    Frames are downscaled to the label size off the GUI thread. A new frame is
+    only sent once the GUI has painted the previous one, so a busy GUI drops
+    frames instead of queueing them.
+    """
+    frame_signal = pyqtSignal(QImage)
+
+    def __init__(self, capture, roi, fps=PREVIEW_FPS, stage_observer=None):
+        super().__init__()
+        self.capture = capture
+        self.roi = roi
+        self.stage_observer = stage_observer
+        self.interval = 1.0 / fps
+        self.target_size = (640, 480)
+        self.pending = False
+        self.boxes = None
+        self.boxes_time = 0.0
+        self.running = True
+
+    def set_target_size(self, width, height):
+        self.target_size = (max(width, 1), max(height, 1))
+
+    def frame_consumed(self):
+        """Called by the GUI once a frame is on screen"""
+        self.pending = False
+
+    def show_detections(self, boxes):
+        """Overlay the latest detection boxes on upcoming preview frames"""
+        self.boxes, self.boxes_time = boxes, time.time()
+
+    def run(self):
+        last_seq = 0
+        while self.running:
+            started = time.time()
+            if not self.pending:
+                seq, frame = self.capture.ring.latest(last_seq)
+                if frame is not None:
+                    last_seq = seq
+                    boxes = self.boxes if started - self.boxes_time < PREVIEW_OVERLAY_HOLD else None
+                    self.pending = True
+                    stage_start = time.perf_counter()
+                    self.frame_signal.emit(frame_to_qimage(frame, boxes, self.roi, self.target_size))
+                    report_stage(self.stage_observer, "preview_frame", stage_start)
+            remaining = self.interval - (time.time() - started)
+            if remaining > 0:
+                self.msleep(int(remaining * 1000))
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+def report_stage(observer, stage, started):
+    """Pass the seconds since the perf_counter() value `started` to an optional stage observer
+
+    Pipeline workers accept a `stage_observer(stage, seconds)` callable; the UI
+    passes its PipelineMetrics and benchmark.py its own recorder.
+    """
+    if observer is not None:
+        observer(stage, time.perf_counter() - started)
+
+class StageHistogram:
+    """Fixed-size latency histogram: cumulative counts plus a rolling window
+
+    Bucket i counts durations up to bounds[i], the last one everything longer.
+    The rolling window is a ring of per-slice counts, so memory stays the same
+    however many samples arrive. Not thread-safe; PipelineMetrics locks it.
+    """
+
+    def __init__(self, bounds=METRICS_BUCKETS, window=METRICS_WINDOW, slices=METRICS_WINDOW_SLICES):
+        self.bounds = bounds
+        self.slice_seconds = window / slices
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.slice_counts = [[0] * (len(bounds) + 1) for _ in range(slices)]
+        self.slice_ids = [None] * slices
+
+    def current_slice(self):
+        return int(time.monotonic() // self.slice_seconds)
+
+    def observe(self, seconds):
+        bucket = bisect_left(self.bounds, seconds)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.sum += seconds
+        slice_id = self.current_slice()
+        index = slice_id % len(self.slice_ids)
+        if self.slice_ids[index] != slice_id:
+            self.slice_ids[index] = slice_id
+            self.slice_counts[index] = [0] * len(self.counts)
+        self.slice_counts[index][bucket] += 1
+
+    def window_counts(self):
+        """Bucket counts of the slices still inside the rolling window"""
+        oldest = self.current_slice() - len(self.slice_ids)
+        counts = [0] * len(self.counts)
+        for slice_id, slice_counts in zip(self.slice_ids, self.slice_counts):
+            if slice_id is not None and slice_id > oldest:
+                counts = [a + b for a, b in zip(counts, slice_counts)]
+        return counts
+
+    def quantile(self, counts, q):
+        """Duration below which a fraction q of `counts` falls, interpolated within its bucket"""
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        cumulative = 0
+        for bucket, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.bounds[bucket - 1] if bucket else 0.0
+                upper = self.bounds[min(bucket, len(self.bounds) - 1)]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.bounds[-1]
+
+class PipelineMetrics:
+    """Per-stage latency histograms, fed through the pipeline's stage_observer hook
+
+    Called as `metrics(stage, seconds)` from any worker thread. Stages not in
+    STAGES get a histogram the first time they are reported.
+    """
+    STAGES = [
+        ("frame_read", "Frame read"),
+        ("preprocess", "Preprocess"),
+        ("inference", "Inference"),
+        ("verdict", "Tally / verdict"),
+        ("color_convert", "Colour conversion"),
+        ("preview_emit", "Result emit"),
+        ("preview_frame", "Live preview frame"),
+        ("db_write", "DB write"),
+        ("plc_write", "PLC write"),
+        ("cycle", "Whole cycle"),
+    ]
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.labels = dict(self.STAGES)
+        self.histograms = {stage: StageHistogram() for stage, _ in self.STAGES}
+
+    def __call__(self, stage, seconds):
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = StageHistogram()
+            histogram.observe(seconds)
+
+    def rolling(self, quantiles=(0.50, 0.95, 0.99)):
+        """(stage, label, samples in the window, per-second rate, seconds at each quantile) rows"""
+        with self.lock:
+            rows = []
+            for stage, histogram in self.histograms.items():
+                counts = histogram.window_counts()
+                total = sum(counts)
+                rows.append((stage, self.labels.get(stage, stage), total, total / METRICS_WINDOW,
+                             [histogram.quantile(counts, q) for q in quantiles]))
+        return rows
+
+    def prometheus_text(self):
+        """All histograms in the Prometheus text exposition format"""
+        lines = [
+            "# HELP circlip_stage_seconds Time spent in each stage of the inspection pipeline.",
+            "# TYPE circlip_stage_seconds histogram",
+        ]
+        with self.lock:
+            windows = {}
+            for stage, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'circlip_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'circlip_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'circlip_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+                windows[stage] = histogram.window_counts(), histogram
+        lines += [
+            f"# HELP circlip_stage_window_seconds Rolling {METRICS_WINDOW:g}s quantiles of each stage.",
+            "# TYPE circlip_stage_window_seconds gauge",
+        ]
+        for stage, (counts, histogram) in windows.items():
+            for q in (0.5, 0.95, 0.99):
+                value = histogram.quantile(counts, q)
+                if value is not None:
+                    lines.append(f'circlip_stage_window_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+        return "\n".join(lines) + "\n"
+
+class MetricsServer:
+    """Serves PipelineMetrics.prometheus_text at http://host:port/metrics from a background thread"""
+
+    def __init__(self, metrics, host=METRICS_HTTP_HOST, port=METRICS_HTTP_PORT):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+
+    def start(self):
+        """Bind and serve; raises OSError when the port is taken"""
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.port
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+class DatabasePool:
+    """Small MySQL connection pool built on DB_CONFIG
+
+    Each task borrows its own connection with `with pool.connection() as conn:`,
+    so the GUI, the result writer and export workers never share one. A
+    connection is only pinged when it sat idle longer than
+    DB_HEALTH_CHECK_INTERVAL, and a connection that fails during use is dropped.
+    After a failed connect, new connects are refused until an exponentially
+    growing back-off delay has passed.
+    """
+
+    def __init__(self, config=DB_CONFIG, size=DB_POOL_SIZE):
+        self.config = config
+        self.size = size
+        self.idle = []  # (connection, last_used)
+        self.created = 0
+        self.condition = threading.Condition()
+        self.retry_delay = 1.0
+        self.next_retry = 0.0
+
+    @property
+    def available(self):
+        """False while reconnects are being backed off after a failure"""
+        return time.time() >= self.next_retry
+
+    def open_connection(self):
+        with self.condition:
+            if not self.available:
+                raise mysql.connector.errors.PoolError(
+                    f"Database unavailable, retrying in {self.next_retry - time.time():.0f}s")
+        try:
+            connection = mysql.connector.connect(**self.config)
+        except mysql.connector.Error:
+            with self.condition:
+                self.next_retry = time.time() + self.retry_delay
+                self.retry_delay = min(self.retry_delay * 2, DB_RETRY_MAX_DELAY)
+            raise
+        with self.condition:
+            self.retry_delay = 1.0
+        return connection
+
+    def acquire(self, timeout=DB_ACQUIRE_TIMEOUT):
+        """Borrow a connection, opening a new one while the pool is below its size"""
+        with self.condition:
+            while not self.idle and self.created >= self.size:
+                if not self.condition.wait(timeout):
+                    raise mysql.connector.errors.PoolError("No free database connection")
+            if self.idle:
+                connection, last_used = self.idle.pop()
+            else:
+                connection, last_used = None, None
+                self.created += 1
+
+        try:
+            if connection is not None and time.time() - last_used > DB_HEALTH_CHECK_INTERVAL:
+                try:
+                    connection.ping()
+                except mysql.connector.Error:
+                    self.close_quietly(connection)
+                    connection = None
+            if connection is None:
+                connection = self.open_connection()
+        except Exception:
+            self.forget()
+            raise
+        return connection
+
+    def release(self, connection, broken=False):
+        """Return a connection to the pool, or drop it when it failed"""
+        if broken:
+            self.close_quietly(connection)
+            self.forget()
+            return
+        with self.condition:
+            self.idle.append((connection, time.time()))
+            self.condition.notify()
+
+    def forget(self):
+        with self.condition:
+            self.created -= 1
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+            self.release(connection, broken=True)
+            raise
+        except BaseException:
+            self.release(connection)
+            raise
+        else:
+            self.release(connection)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection and run the block as one transaction
+
+        DB_CONFIG turns autocommit on, so statements that must succeed or fail
+        together need an explicit transaction; it is rolled back on any error.
+        """
+        with self.connection() as connection:
+            connection.start_transaction()
+            try:
+                yield connection
+                connection.commit()
+            except BaseException:
+                try:
+                    connection.rollback()
+                except mysql.connector.Error:
+                    pass
+                raise
+
+    def close_quietly(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def reset(self):
+        """Drop idle connections and allow an immediate reconnect"""
+        with self.condition:
+            idle, self.idle = self.idle, []
+            self.created -= len(idle)
+            self.retry_delay = 1.0
+            self.next_retry = 0.0
+            self.condition.notify_all()
+        for connection, _ in idle:
+            self.close_quietly(connection)
+
+def day_range(day):
+    """Half-open [start, end) datetime range covering one day, for index-friendly filters
+
+    `day` is a date or a 'YYYY-MM-DD' string; a malformed string raises ValueError.
+    """
+    if isinstance(day, str):
+        day = datetime.strptime(day, '%Y-%m-%d').date()
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+def date_range(first, last):
+    """Half-open [start, end) datetime range covering the days `first` through `last`"""
+    start, end = day_range(first)[0], day_range(last)[1]
+    if end <= start:
+        raise ValueError("End date is before start date")
+    return start, end
+
+def rollup_totals(connection, start, end, period='day'):
+    """Counts and average percentages for [start, end) read from detection_rollups
+
+    `start` and `end` must fall on `period` boundaries. Only one rollup row per
+    period is read, so long ranges cost no more than a scan of their days.
+    """
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT COALESCE(SUM(total), 0) as total, COALESCE(SUM(passed), 0) as passed,
+               SUM(single_sum) / SUM(total) as single,
+               SUM(multiple_sum) / SUM(total) as multiple,
+               SUM(none_sum) / SUM(total) as none
+        FROM detection_rollups
+        WHERE period = %s AND period_start >= %s AND period_start < %s
+    """, (period, start, end))
+    row = cursor.fetchone()
+    cursor.close()
+    return {
+        'total': int(row['total']),
+        'passed': int(row['passed']),
+        'single': float(row['single'] or 0),
+        'multiple': float(row['multiple'] or 0),
+        'none': float(row['none'] or 0),
+    }
+
+class SchemaMigrator:
+    """Applies the numbered SCHEMA_MIGRATIONS that the database has not seen yet
+
+    Applied versions are recorded in schema_migrations. A named MySQL lock keeps
+    two stations from migrating the same database at once.
+    """
+    # Errors meaning a step's object already exists, e.g. an index created by hand
+    ALREADY_APPLIED = (errorcode.ER_DUP_KEYNAME, errorcode.ER_DUP_FIELDNAME, errorcode.ER_TABLE_EXISTS_ERROR)
+
+    MIGRATIONS = [
+        (1, "Create detection_results", [
+            """
+            CREATE TABLE IF NOT EXISTS detection_results (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                single_circlip_percentage FLOAT NOT NULL,
+                multiple_circlips_percentage FLOAT NOT NULL,
+                no_circlip_percentage FLOAT NOT NULL,
+                result VARCHAR(10) NOT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """,
+        ]),
+        (2, "Index detection_results.timestamp", [
+            "CREATE INDEX idx_detection_results_timestamp ON detection_results (timestamp)",
+        ]),
+        (3, "Create detection_rollups with hourly and daily totals", [
+            """
+            CREATE TABLE IF NOT EXISTS detection_rollups (
+                period ENUM('hour', 'day') NOT NULL,
+                period_start DATETIME NOT NULL,
+                total INT NOT NULL DEFAULT 0,
+                passed INT NOT NULL DEFAULT 0,
+                single_sum DOUBLE NOT NULL DEFAULT 0,
+                multiple_sum DOUBLE NOT NULL DEFAULT 0,
+                none_sum DOUBLE NOT NULL DEFAULT 0,
+                PRIMARY KEY (period, period_start)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """,
+            # Backfill from the existing rows; overwriting keeps a re-run harmless
+            """
+            INSERT INTO detection_rollups (
+                period, period_start, total, passed, single_sum, multiple_sum, none_sum
+            )
+            SELECT 'hour', DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00'), COUNT(*), SUM(result = 'YES'),
+                   SUM(single_circlip_percentage), SUM(multiple_circlips_percentage),
+                   SUM(no_circlip_percentage)
+            FROM detection_results
+            GROUP BY DATE_FORMAT(timestamp, '%Y-%m-%d %H:00:00')
+            ON DUPLICATE KEY UPDATE total = VALUES(total), passed = VALUES(passed),
+                single_sum = VALUES(single_sum), multiple_sum = VALUES(multiple_sum),
+                none_sum = VALUES(none_sum)
+            """,
+            """
+            INSERT INTO detection_rollups (
+                period, period_start, total, passed, single_sum, multiple_sum, none_sum
+            )
+            SELECT 'day', DATE(timestamp), COUNT(*), SUM(result = 'YES'),
+                   SUM(single_circlip_percentage), SUM(multiple_circlips_percentage),
+                   SUM(no_circlip_percentage)
+            FROM detection_results
+            GROUP BY DATE(timestamp)
+            ON DUPLICATE KEY UPDATE total = VALUES(total), passed = VALUES(passed),
+                single_sum = VALUES(single_sum), multiple_sum = VALUES(multiple_sum),
+                none_sum = VALUES(none_sum)
+            """,
+        ]),
+    ]
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def applied_versions(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+
+    def migrate(self):
+        """Apply pending migrations in order; returns the descriptions of those applied"""
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT GET_LOCK('circlip_schema_migration', 30)")
+        if cursor.fetchone()[0] != 1:
+            cursor.close()
+            raise mysql.connector.errors.OperationalError("Timed out waiting for the schema migration lock")
+
+        applied = []
+        try:
+            done = self.applied_versions(cursor)
+            for version, description, statements in self.MIGRATIONS:
+                if version in done:
+                    continue
+                for statement in statements:
+                    try:
+                        cursor.execute(statement)
+                    except mysql.connector.Error as e:
+                        if e.errno not in self.ALREADY_APPLIED:
+                            raise
+                cursor.execute("INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                               (version, description))
+                self.connection.commit()
+                applied.append(description)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK('circlip_schema_migration')")
+            cursor.fetchall()
+            cursor.close()
+        return applied
+
+class ResultWriter(QThread):
+    """Background writer that batches detection results into MySQL
+
+    Detection cycles only put rows on a bounded queue. The writer inserts them
+    with executemany on a pooled connection. While MySQL is unreachable (or the
+    queue overflows) rows go to a local SQLite spool, which is replayed in order
+    once the database is back. The hourly and daily detection_rollups rows are
+    updated in the same transaction as every insert and delete.
+    """
+    log_signal = pyqtSignal(str, str)
+    changed_signal = pyqtSignal()
+    deleted_signal = pyqtSignal(int)
+
+    INSERT_QUERY = """
+        INSERT INTO detection_results (
+            timestamp,
+            single_circlip_percentage, 
+            multiple_circlips_percentage, 
+            no_circlip_percentage, 
+            result
+        ) VALUES (%s, %s, %s, %s, %s)
+    """
+
+    ROLLUP_QUERY = """
+        INSERT INTO detection_rollups (
+            period, period_start, total, passed, single_sum, multiple_sum, none_sum
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            total = total + VALUES(total),
+            passed = passed + VALUES(passed),
+            single_sum = single_sum + VALUES(single_sum),
+            multiple_sum = multiple_sum + VALUES(multiple_sum),
+            none_sum = none_sum + VALUES(none_sum)
+    """
+
+    def __init__(self, db_pool, spool_path=RESULT_SPOOL_FILE, stage_observer=None):
+        super().__init__()
+        self.db_pool = db_pool
+        self.spool_path = spool_path
+        self.stage_observer = stage_observer
+        self.queue = queue.Queue(maxsize=RESULT_QUEUE_SIZE)
+        self.overflow = []
+        self.overflow_lock = threading.Lock()
+        self.db_available = True
+        self.spooled = 0
+        self.running = True
+
+    def submit(self, single, multiple, none, result):
+        """Queue one result without ever blocking the caller"""
+        row = (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), single, multiple, none, result)
+        try:
+            self.queue.put_nowait(("insert", row))
+        except queue.Full:
+            # Spooled by the writer thread, since the SQLite connection belongs to it
+            with self.overflow_lock:
+                self.overflow.append(row)
+
+    def discard_last(self):
+        """Remove the most recent result, wherever it currently is"""
+        self.queue.put(("discard", None))
+
+    def set_db_available(self, available, error=None):
+        """Log database outages once, when they start and end"""
+        if available and not self.db_available:
+            self.log_signal.emit("Result writer reconnected to database", "info")
+        elif not available and self.db_available:
+            self.log_signal.emit(f"Result writer database error: {error}", "error")
+        self.db_available = available
+
+    def open_spool(self):
+        spool = sqlite3.connect(self.spool_path)
+        spool.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                single REAL NOT NULL,
+                multiple REAL NOT NULL,
+                none REAL NOT NULL,
+                result TEXT NOT NULL
+            )
+        """)
+        spool.commit()
+        self.spooled = spool.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+        if self.spooled:
+            self.log_signal.emit(f"{self.spooled} spooled results waiting for the database", "warning")
+        return spool
+
+    def spool_rows(self, spool, rows):
+        spool.executemany(
+            "INSERT INTO spool (timestamp, single, multiple, none, result) VALUES (?, ?, ?, ?, ?)", rows)
+        spool.commit()
+        self.spooled += len(rows)
+
+    @staticmethod
+    def rollup_deltas(rows, sign=1):
+        """Per-hour and per-day changes to detection_rollups for (timestamp, single, multiple, none, result) rows"""
+        totals = {}
+        for timestamp, single, multiple, none, result in rows:
+            timestamp = str(timestamp)
+            for key in (('hour', timestamp[:13] + ':00:00'), ('day', timestamp[:10] + ' 00:00:00')):
+                total = totals.setdefault(key, [0, 0, 0.0, 0.0, 0.0])
+                total[0] += sign
+                total[1] += sign if result == "YES" else 0
+                total[2] += sign * single
+                total[3] += sign * multiple
+                total[4] += sign * none
+        return [(*key, *total) for key, total in totals.items()]
+
+    def write_rows(self, rows):
+        """Insert rows into MySQL in one transaction; returns False if they were not stored"""
+        started = time.perf_counter()
+        try:
+            with self.db_pool.transaction() as connection:
+                cursor = connection.cursor()
+                cursor.executemany(self.INSERT_QUERY, rows)
+                cursor.executemany(self.ROLLUP_QUERY, self.rollup_deltas(rows))
+                cursor.close()
+        except mysql.connector.Error as e:
+            self.set_db_available(False, e)
+            return False
+        report_stage(self.stage_observer, "db_write", started)
+        self.set_db_available(True)
+        return True
+
+    def replay_spool(self, spool):
+        """Move spooled rows into MySQL, oldest first"""
+        while self.spooled:
+            chunk = spool.execute(
+                "SELECT id, timestamp, single, multiple, none, result FROM spool ORDER BY id LIMIT ?",
+                (RESULT_BATCH_SIZE,)).fetchall()
+            if not chunk:
+                self.spooled = 0
+                break
+            if not self.write_rows([row[1:] for row in chunk]):
+                return
+            spool.execute("DELETE FROM spool WHERE id <= ?", (chunk[-1][0],))
+            spool.commit()
+            self.spooled -= len(chunk)
+            self.log_signal.emit(f"Replayed {len(chunk)} spooled results", "info")
+            self.changed_signal.emit()
+
+    def discard_stored(self, spool):
+        """Remove the newest result that has already left the queue"""
+        if self.spooled:
+            spool.execute("DELETE FROM spool WHERE id = (SELECT MAX(id) FROM spool)")
+            spool.commit()
+            self.spooled -= 1
+            self.log_signal.emit("Deleted last spooled result", "info")
+            return
+        try:
+            with self.db_pool.transaction() as connection:
+                cursor = connection.cursor()
+                # Get the last record, whose counts come off the rollups too
+                cursor.execute("""
+                    SELECT id, timestamp, single_circlip_percentage, multiple_circlips_percentage,
+                           no_circlip_percentage, result
+                    FROM detection_results ORDER BY id DESC LIMIT 1 FOR UPDATE
+                """)
+                last = cursor.fetchone()
+                if last:
+                    cursor.execute("DELETE FROM detection_results WHERE id = %s", (last[0],))
+                    cursor.executemany(self.ROLLUP_QUERY, self.rollup_deltas([last[1:]], -1))
+                cursor.close()
+        except mysql.connector.Error as e:
+            self.log_signal.emit(f"Cannot delete last result: {e}", "error")
+            return
+        if last:
+            self.log_signal.emit(f"Deleted last record (ID: {last[0]})", "info")
+            self.deleted_signal.emit(last[0])
+
+    def next_batch(self, spool):
+        """Collect queued rows for one insert, applying discards in order"""
+        batch = []
+        deadline = time.time() + RESULT_FLUSH_INTERVAL
+        while len(batch) < RESULT_BATCH_SIZE:
+            try:
+                kind, row = self.queue.get(timeout=max(deadline - time.time(), 0) if batch or self.running else 0)
+            except queue.Empty:
+                break
+            if kind == "insert":
+                batch.append(row)
+            elif batch:
+                batch.pop()
+                self.log_signal.emit("Discarded last result before it was stored", "info")
+            else:
+                self.discard_stored(spool)
+                self.changed_signal.emit()
+        with self.overflow_lock:
+            overflow, self.overflow = self.overflow, []
+        if overflow:
+            self.spool_rows(spool, overflow)
+            self.log_signal.emit(f"Result queue full, spooled {len(overflow)} results", "warning")
+        return batch
+
+    def run(self):
+        spool = self.open_spool()
+        while self.running or not self.queue.empty():
+            batch = self.next_batch(spool)
+            if self.spooled and self.db_pool.available:
+                self.replay_spool(spool)
+            if not batch:
+                continue
+            # Keep chronological order: never insert ahead of older spooled rows
+            if not self.spooled and self.write_rows(batch):
+                self.log_signal.emit(f"Stored {len(batch)} result(s) in database", "info")
+            else:
+                self.spool_rows(spool, batch)
+                self.log_signal.emit(f"Database unavailable, spooled {len(batch)} result(s) locally", "warning")
+            self.changed_signal.emit()
+
+        spool.close()
+
+    def stop(self):
+        self.running = False
+        self.wait()
+
+class DetectionTableModel(QAbstractTableModel):
+    """Newest-first detection rows for one day, paged from MySQL on demand
+
+    Rows are fetched a page at a time with keyset queries on id as the view
+    scrolls (canFetchMore/fetchMore). Only the TABLE_CACHED_PAGES most recently
+    used pages are kept in memory; an evicted page is re-read by its id range
+    when it is shown again. The newest page, which refresh() tops up with new
+    rows, is never evicted. `columns` is a list of (header, field, format).
+    """
+    log_signal = pyqtSignal(str, str)
+
+    SELECT_QUERY = """
+        SELECT id, timestamp, TIME(timestamp) as time, result,
+               single_circlip_percentage as single,
+               multiple_circlips_percentage as multiple,
+               no_circlip_percentage as none
+        FROM detection_results
+        WHERE timestamp >= %s AND timestamp < %s
+    """
+
+    def __init__(self, db_pool, columns, page_size=TABLE_PAGE_SIZE,
+                 cached_pages=TABLE_CACHED_PAGES, parent=None):
+        super().__init__(parent)
+        self.db_pool = db_pool
+        self.columns = columns
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+        self.range = None
+        self.pages = []             # [newest id, oldest id, row count], newest page first
+        self.offsets = []           # first row number of each page
+        self.cache = OrderedDict()  # oldest id of a page -> its rows, least recently used first
+        self.newest_id = 0
+        self.upto_id = None
+        self.exhausted = True
+
+    def set_day(self, day, upto_id=None):
+        """Show `day` from the top; raises ValueError for a malformed date string"""
+        self.set_range(*day_range(day), upto_id)
+
+    def set_range(self, start, end, upto_id=None):
+        """Show the rows timestamped in [start, end) from the top
+
+        With `upto_id`, only rows up to that id are loaded and refresh() picks
+        up everything after it, so the rows shown match counters read together
+        with that id.
+        """
+        self.beginResetModel()
+        self.range = (start, end)
+        self.pages = []
+        self.offsets = []
+        self.cache.clear()
+        self.newest_id = upto_id or 0
+        self.upto_id = upto_id
+        self.exhausted = False
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+
+    def query(self, condition, params, limit=None):
+        with self.db_pool.connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            sql = self.SELECT_QUERY + condition + " ORDER BY id DESC"
+            if limit:
+                sql += f" LIMIT {int(limit)}"
+            cursor.execute(sql, (*self.range, *params))
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def add_page(self, position, rows):
+        page = [rows[0]['id'], rows[-1]['id'], len(rows)]
+        self.pages.insert(position, page)
+        self.cache_rows(page, rows)
+        self.update_offsets()
+
+    def cache_rows(self, page, rows):
+        self.cache[page[1]] = rows
+        self.cache.move_to_end(page[1])
+        head = self.pages[0][1] if self.pages else None
+        while len(self.cache) > self.cached_pages:
+            oldest = next((key for key in self.cache if key != head), None)
+            if oldest is None:
+                break
+            del self.cache[oldest]
+
+    def update_offsets(self):
+        self.offsets = []
+        total = 0
+        for page in self.pages:
+            self.offsets.append(total)
+            total += page[2]
+
+    def page_rows(self, index):
+        page = self.pages[index]
+        rows = self.cache.get(page[1])
+        if rows is None:
+            rows = self.query(" AND id <= %s AND id >= %s", (page[0], page[1]))
+            self.cache_rows(page, rows)
+        else:
+            self.cache.move_to_end(page[1])
+        return rows
+
+    def record(self, row):
+        """Row dict shown at `row`, reading its page back in if it was evicted"""
+        index = bisect_right(self.offsets, row) - 1
+        try:
+            rows = self.page_rows(index)
+        except mysql.connector.Error as e:
+            self.log_signal.emit(f"Database error loading rows: {e}", "error")
+            return None
+        offset = row - self.offsets[index]
+        # A page can come back short if rows were deleted behind our back
+        return rows[offset] if offset < len(rows) else None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or not self.pages:
+            return 0
+        return self.offsets[-1] + self.pages[-1][2]
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.BackgroundRole):
+            return None
+        record = self.record(index.row())
+        if record is None:
+            return None
+        if role == Qt.BackgroundRole:
+            return QColor(Qt.green) if record['result'] == "YES" else QColor(Qt.red)
+        _, field, fmt = self.columns[index.column()]
+        return fmt.format(record[field])
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        try:
+            if self.pages:
+                rows = self.query(" AND id < %s", (self.pages[-1][1],), self.page_size)
+            elif self.upto_id is not None:
+                rows = self.query(" AND id <= %s", (self.upto_id,), self.page_size)
+            else:
+                rows = self.query("", (), self.page_size)
+        except mysql.connector.Error as e:
+            self.exhausted = True
+            self.log_signal.emit(f"Database error loading rows: {e}", "error")
+            return
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        if not rows:
+            return
+        if not self.pages:
+            self.newest_id = max(self.newest_id, rows[0]['id'])
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.add_page(len(self.pages), rows)
+        self.endInsertRows()
+
+    def refresh(self):
+        """Prepend rows stored since the newest one shown and return them
+
+        Raises mysql.connector.Error so the caller can report it.
+        """
+        if self.range is None:
+            return []
+        rows = self.query(" AND id > %s", (self.newest_id,))
+        if rows:
+            self.beginInsertRows(QModelIndex(), 0, len(rows) - 1)
+            self.prepend_rows(rows)
+            self.newest_id = rows[0]['id']
+            self.endInsertRows()
+        return rows
+
+    def prepend_rows(self, rows):
+        """Put newer rows (newest first) in front, filling the newest page before starting another"""
+        new = rows
+        if self.pages and self.pages[0][2] < self.page_size:
+            head = self.pages[0]
+            room = self.page_size - head[2]
+            merged, new = rows[-room:], rows[:-room]
+            self.page_rows(0)[:0] = merged
+            head[0] = merged[0]['id']
+            head[2] += len(merged)
+        while new:
+            self.add_page(0, new[-self.page_size:])
+            new = new[:-self.page_size]
+        self.update_offsets()
+
+    def remove_record(self, record_id):
+        """Drop a deleted record from the view and return its row, if it was shown"""
+        for index, page in enumerate(self.pages):
+            if page[1] <= record_id <= page[0]:
+                break
+        else:
+            return None
+        try:
+            rows = self.page_rows(index)
+        except mysql.connector.Error as e:
+            self.log_signal.emit(f"Database error loading rows: {e}", "error")
+            return None
+        offset = next((i for i, r in enumerate(rows) if r['id'] == record_id), None)
+        if offset is None or offset >= page[2]:
+            return None
+        row = self.offsets[index] + offset
+        self.beginRemoveRows(QModelIndex(), row, row)
+        record = rows.pop(offset)
+        page[2] -= 1
+        if not page[2]:
+            del self.pages[index]
+            self.cache.pop(page[1], None)
+        self.update_offsets()
+        self.endRemoveRows()
+        return record
+
+class CsvExportThread(QThread):
+    """Streams detection rows for [start, end) into a CSV file
+
+    Rows are read from an unbuffered cursor CSV_EXPORT_CHUNK at a time and
+    written as they arrive, so memory stays flat however long the range is.
+    The expected row count comes from the rollups, for the progress bar.
+    """
+    log_signal = pyqtSignal(str, str)
+    progress_signal = pyqtSignal(int, int)  # rows written, rows expected
+    finished_signal = pyqtSignal(str, int)  # file path, rows written (-1 when cancelled or failed)
+
+    EXPORT_QUERY = """
+        SELECT timestamp, result, 
+               single_circlip_percentage as single, 
+               multiple_circlips_percentage as multiple,
+               no_circlip_percentage as none
+        FROM detection_results 
+        WHERE timestamp >= %s AND timestamp < %s
+        ORDER BY timestamp DESC
+    """
+
+    def __init__(self, db_pool, start, end, file_path):
+        super().__init__()
+        self.db_pool = db_pool
+        self.start_time = start
+        self.end_time = end
+        self.file_path = file_path
+        self.cancelled = False
+        self.file_written = False  # set once export() opened file_path for writing
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        written = -1
+        try:
+            written = self.export()
+        except (mysql.connector.Error, OSError) as e:
+            self.log_signal.emit(f"CSV export failed: {e}", "error")
+        # A failure before the file was opened leaves an existing file untouched
+        if (written <= 0 or self.cancelled) and self.file_written and os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        if self.cancelled:
+            self.log_signal.emit("CSV export cancelled", "warning")
+            written = -1
+        self.finished_signal.emit(self.file_path, written)
+
+    def export(self):
+        connection = self.db_pool.acquire()
+        # Dropped unless every row was read, since a half-read unbuffered result blocks the connection
+        broken = True
+        try:
+            expected = rollup_totals(connection, self.start_time, self.end_time)['total']
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(self.EXPORT_QUERY, (self.start_time, self.end_time))
+            written = 0
+            with open(self.file_path, mode='w', newline='') as csv_file:
+                self.file_written = True
+                writer = csv.writer(csv_file)
+                writer.writerow(['timestamp', 'result', 'single', 'multiple', 'none'])
+                while not self.cancelled:
+                    rows = cursor.fetchmany(CSV_EXPORT_CHUNK)
+                    if not rows:
+                        break
+                    writer.writerows(rows)
+                    written += len(rows)
+                    self.progress_signal.emit(written, max(expected, written))
+            if not self.cancelled:
+                cursor.close()
+                broken = False
+        finally:
+            self.db_pool.release(connection, broken)
+        return written
+
+class PdfReportThread(QThread):
+    """Builds a PDF report for [start, end) off the GUI thread
+
+    Rows are streamed from MySQL into one small reportlab Table per
+    PDF_TABLE_CHUNK rows (repeating the column header when a chunk is split
+    across pages) instead of one giant table. The title and the summary, read
+    from the rollups, are rendered once. Ranges longer than a day also get a
+    per-day breakdown.
+    """
+    log_signal = pyqtSignal(str, str)
+    finished_signal = pyqtSignal(str, int)  # file path, rows written (-1 when failed)
+
+    HEADER = ['Timestamp', 'Result', 'Single %', 'Multiple %', 'No Circlip %']
+
+    def __init__(self, db_pool, start, end, file_path, title, date_label):
+        super().__init__()
+        self.db_pool = db_pool
+        self.start_time = start
+        self.end_time = end
+        self.file_path = file_path
+        self.title = title
+        self.date_label = date_label
+
+    def run(self):
+        written = -1
+        try:
+            written = self.build()
+        except Exception as e:
+            # reportlab layout errors have no common base class
+            self.log_signal.emit(f"PDF export failed: {e}", "error")
+        self.finished_signal.emit(self.file_path, written)
+
+    def make_table(self, data):
+        from reportlab.platypus import Table, TableStyle
+        from reportlab.lib import colors
+        
+        table = Table(data, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        return table
+
+    def daily_breakdown(self, connection):
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT period_start, total, passed
+            FROM detection_rollups
+            WHERE period = 'day' AND period_start >= %s AND period_start < %s
+            ORDER BY period_start
+        """, (self.start_time, self.end_time))
+        days = cursor.fetchall()
+        cursor.close()
+        data = [['Date', 'Total', 'Passed', 'Failed']]
+        for day, total, passed in days:
+            data.append([day.strftime('%Y-%m-%d'), str(total), str(passed), str(total - passed)])
+        return data
+
+    def build(self):
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph
+        from reportlab.lib.styles import getSampleStyleSheet
+        
+        styles = getSampleStyleSheet()
+        elements = [
+            Paragraph(self.title, styles['Title']),
+            Paragraph(f"Date: {self.date_label}", styles['Normal']),
+            Paragraph(" ", styles['Normal']),  # Spacer
+        ]
+        written = 0
+        connection = self.db_pool.acquire()
+        # Dropped unless every row was read, since a half-read unbuffered result blocks the connection
+        broken = True
+        try:
+            # Summary, breakdown and rows from one snapshot, so the totals match the listed rows
+            connection.start_transaction(consistent_snapshot=True, readonly=True)
+            totals = rollup_totals(connection, self.start_time, self.end_time)
+            days = None
+            if self.end_time - self.start_time > timedelta(days=1):
+                days = self.daily_breakdown(connection)
+            cursor = connection.cursor(buffered=False)
+            cursor.execute(CsvExportThread.EXPORT_QUERY, (self.start_time, self.end_time))
+            while True:
+                rows = cursor.fetchmany(PDF_TABLE_CHUNK)
+                if not rows:
+                    break
+                data = [self.HEADER]
+                for timestamp, result, single, multiple, none in rows:
+                    data.append([str(timestamp), result, f"{single:.1f}", f"{multiple:.1f}", f"{none:.1f}"])
+                elements.append(self.make_table(data))
+                written += len(rows)
+            cursor.close()
+            connection.commit()
+            broken = False
+        finally:
+            self.db_pool.release(connection, broken)
+
+        if not written:
+            return 0
+
+        # Summary statistics, from the rollups
+        elements.append(Paragraph(" ", styles['Normal']))  # Spacer
+        elements.append(Paragraph(f"Total Detections: {totals['total']}", styles['Normal']))
+        elements.append(Paragraph(f"Passed: {totals['passed']}", styles['Normal']))
+        elements.append(Paragraph(f"Failed: {totals['total'] - totals['passed']}", styles['Normal']))
+        elements.append(Paragraph(
+            f"Average Single / Multiple / No Circlip %: {totals['single']:.1f} / "
+            f"{totals['multiple']:.1f} / {totals['none']:.1f}", styles['Normal']))
+        if days and len(days) > 1:
+            elements.append(Paragraph(" ", styles['Normal']))  # Spacer
+            elements.append(self.make_table(days))
+
+        doc = SimpleDocTemplate(self.file_path, pagesize=letter)
+        doc.build(elements)
+        return written
+
+class PLCSocket(socket.socket):
+    """TCP socket that remembers its last failure for PLCWorker.call
+
+    rk_mcprotocol turns every exception into a returned message, and loops on
+    recv until enough bytes arrived, so a closed connection (recv returning
+    b'') would otherwise spin forever; here it raises and is recorded instead.
+    """
+    failure = None
+
+    def send(self, data, flags=0):
+        try:
+            return super().send(data, flags)
+        except OSError as e:
+            self.failure = e
+            raise
+
+    def recv(self, bufsize, flags=0):
+        try:
+            data = super().recv(bufsize, flags)
+        except OSError as e:
+            self.failure = e
+            raise
+        if not data:
+            self.failure = ConnectionResetError("PLC closed the connection")
+            raise self.failure
+        return data
+
+class PLCWorker(QThread):
+    """Owns the PLC socket; everything else talks to the PLC through it
+
+    The trigger register is read every PLC_HEARTBEAT_INTERVAL, which keeps the
+    connection alive and doubles as the auto-mode trigger poll; its edges are
+    only detected and acknowledged while a trigger is armed. Writes are only
+    queued: registers are coalesced (newest value wins) and contiguous ones go
+    out in a single write_sign_word call, so a slow or absent PLC never delays
+    an inspection cycle. A failed connection is retried with a back-off delay.
+    """
+    log_signal = pyqtSignal(str, str)
+    status_signal = pyqtSignal(bool)  # connected
+
+    def __init__(self, host=PLC_HOST, port=PLC_PORT, trigger_register=PLC_TRIGGER_REGISTER,
+                 acknowledge=PLC_TRIGGER_ACK, stage_observer=None):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.trigger_register = trigger_register
+        self.acknowledge = acknowledge
+        self.stage_observer = stage_observer
+        self.socket = None
+        self.pending = {}  # (device, address) -> value
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.retry_delay = 1.0
+        self.next_attempt = 0.0
+        self.reconnect_requested = False
+        self.trigger_armed = False
+        self.trigger_value = None  # None until the first read after arming
+        self.triggered = False
+        self.cycle_count = 0
+        self.last_error = None
+        self.running = True
+
+    @property
+    def connected(self):
+        return self.socket is not None
+
+    @staticmethod
+    def parse_register(register):
+        """'D12' -> ('D', 12); only decimal word devices are queued"""
+        return register[0].upper(), int(register[1:])
+
+    def queue_words(self, register, values):
+        """Queue consecutive words starting at `register` for the next batched write"""
+        device, address = self.parse_register(register)
+        with self.lock:
+            for offset, value in enumerate(values):
+                self.pending[(device, address + offset)] = int(value) & 0xFFFF
+        self.wake.set()
+
+    def send_result(self, result, single_percent):
+        """Queue the verdict, plus the status words when PLC_STATUS_WORDS is on"""
+        values = [1 if result == "YES" else 0]
+        if PLC_STATUS_WORDS:
+            self.cycle_count = (self.cycle_count + 1) & 0xFFFF
+            values += [self.cycle_count, round(single_percent * 10), PLC_FAULT_NONE]
+        self.queue_words(PLC_RESULT_REGISTER, values)
+
+    def send_fault(self, fault):
+        """Queue a fault code for a cycle that produced no verdict"""
+        if PLC_STATUS_WORDS:
+            device, address = self.parse_register(PLC_RESULT_REGISTER)
+            self.queue_words(f"{device}{address + 3}", [fault])
+
+    def set_trigger_armed(self, armed):
+        """Start or stop watching the trigger register for automatic inspection
+
+        Any edge seen earlier is forgotten and the first read after arming only
+        sets the baseline, so a register that is already high when arming never
+        starts a cycle. Only a low to high change seen while armed counts.
+        """
+        with self.lock:
+            self.trigger_armed = armed
+            self.triggered = False
+            self.trigger_value = None
+
+    def take_trigger(self):
+        """True once per rising edge of the trigger register"""
+        if not self.connected:
+            raise ConnectionError("PLC not connected")
+        with self.lock:
+            fired, self.triggered = self.triggered, False
+        return fired
+
+    def reconnect_now(self):
+        """Drop the current connection and retry immediately"""
+        self.reconnect_requested = True
+        self.wake.set()
+
+    def report_error(self, message):
+        """Log each distinct error once instead of on every heartbeat"""
+        if message != self.last_error:
+            self.last_error = message
+            self.log_signal.emit(message, "error")
+
+    def connect_socket(self):
+        self.next_attempt = time.time() + self.retry_delay
+        # Like mc.open_socket, but with a connect timeout
+        plc_socket = PLCSocket(socket.AF_INET, socket.SOCK_STREAM)
+        plc_socket.settimeout(PLC_SOCKET_TIMEOUT)
+        try:
+            plc_socket.connect((self.host, self.port))
+            self.socket = plc_socket
+        except OSError as e:
+            plc_socket.close()
+            self.report_error(f"PLC connection error: {e}")
+            self.retry_delay = min(self.retry_delay * 2, PLC_RECONNECT_MAX_DELAY)
+            self.status_signal.emit(False)
+            return
+        self.retry_delay = 1.0
+        self.last_error = None
+        self.log_signal.emit("PLC connected successfully", "info")
+        self.status_signal.emit(True)
+
+    def drop_connection(self, error=None):
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except OSError:
+                pass
+            self.socket = None
+            self.status_signal.emit(False)
+        if error is not None:
+            self.report_error(f"PLC connection lost: {error}")
+
+    def call(self, function, *args):
+        """Run an rk_mcprotocol function, raising the socket error it swallowed"""
+        result = function(self.socket, *args)
+        if self.socket.failure is not None:
+            raise self.socket.failure
+        return result
+
+    def flush(self):
+        """Write all queued registers, one write per contiguous run"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        runs = []
+        for key in sorted(pending):
+            run = runs[-1] if runs else None
+            if run and run[0] == key[0] and run[1] + len(run[2]) == key[1]:
+                run[2].append(pending[key])
+            else:
+                runs.append((key[0], key[1], [pending[key]]))
+
+        for index, (device, address, values) in enumerate(runs):
+            started = time.perf_counter()
+            try:
+                status = self.call(mc.write_sign_word, f"{device}{address}", values, False)
+            except OSError:
+                # Put back what was not written, unless a newer value was queued meanwhile
+                with self.lock:
+                    for device, address, values in runs[index:]:
+                        for offset, value in enumerate(values):
+                            self.pending.setdefault((device, address + offset), value)
+                raise
+            # rk_mcprotocol reports PLC errors as a message instead of raising
+            if status == "OK":
+                report_stage(self.stage_observer, "plc_write", started)
+                self.log_signal.emit(f"Sent to PLC {device}{address}: {values}", "info")
+            else:
+                self.log_signal.emit(f"Failed to write to PLC {device}{address}: {status}", "error")
+
+    def heartbeat(self):
+        values = self.call(mc.read_sign_word, self.trigger_register, 1, False)
+        if not isinstance(values, list):
+            self.report_error(f"PLC trigger read failed: {values}")
+            return
+        self.last_error = None
+        with self.lock:
+            # In manual mode the register is only read, never acknowledged
+            if not self.trigger_armed:
+                return
+            fired = values[0] != 0 and self.trigger_value == 0
+            if self.trigger_value is None and values[0] != 0:
+                self.log_signal.emit("PLC trigger already set when armed, waiting for it to clear", "warning")
+            self.trigger_value = values[0]
+            if fired:
+                self.triggered = True
+        if fired:
+            if self.acknowledge:
+                self.queue_words(self.trigger_register, [0])
+                self.trigger_value = 0
+
+    def run(self):
+        while self.running:
+            if self.reconnect_requested:
+                self.reconnect_requested = False
+                self.log_signal.emit("Attempting to reconnect to PLC...", "info")
+                self.drop_connection()
+                self.next_attempt = 0.0
+            if self.socket is None:
+                if time.time() >= self.next_attempt:
+                    self.connect_socket()
+                if self.socket is None:
+                    self.wake.wait(min(max(self.next_attempt - time.time(), 0.01), 0.5))
+                    self.wake.clear()
+                    continue
+
+            try:
+                self.flush()
+                self.heartbeat()
+            except OSError as e:
+                self.drop_connection(e)
+                continue
+            self.wake.wait(PLC_HEARTBEAT_INTERVAL)
+            self.wake.clear()
+
+        # Last queued verdict still goes out on shutdown if the PLC is there
+        if self.socket is not None:
+            try:
+                self.flush()
+            except OSError:
+                pass
+        self.drop_connection()
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+        self.wait()
 
 class DetectionThread(QThread):
     update_signal = pyqtSignal(str, float, float, float, str, QImage)
     error_signal = pyqtSignal(str)
     log_signal = pyqtSignal(str, str)
-    frame_signal = pyqtSignal(QImage)
     alert_signal = pyqtSignal(str, str)
     
-    def __init__(self, plc_socket, db_connection):
+    def __init__(self, plc, result_writer, model_service, capture, preview=None, stage_observer=None):
         super().__init__()
-        self.plc_socket = plc_socket
-        self.db_connection = db_connection
+        self.plc = plc
+        self.result_writer = result_writer
+        self.model_service = model_service
+        self.capture = capture
+        self.preview = preview
+        self.stage_observer = stage_observer
+        self.verdict_rule = EarlyExitRule()
+        self.change_gate = FrameChangeGate(model_service.roi)
         self.running = True
         self.frame_count = 0
+        self.frames_per_second = None
         self.processing_times = []
         
     def run(self):
+        self.run_cycle()
+
+    def run_cycle(self):
+        """Inspect the part currently under the camera and publish the verdict"""
+        self.processing_times = []
+        self.frame_count = 0
+        self.frames_per_second = None
+        cycle_start = time.perf_counter()
         try:
-            if not self.db_connection.is_connected():
-                self.db_connection.reconnect()
-                
-            self.log_signal.emit("Loading YOLO model...", "info")
-            model = YOLO("yolov8training/exp1/weights/best.pt")
-            # model.to("cuda" if torch.cuda.is_available() else "cpu")
-            model.to('cpu')
+            # New weights load in the background; this cycle still uses the current model
+            if self.model_service.reload_in_background(self.log_signal.emit):
+                self.log_signal.emit("Model weights changed, reloading in the background", "info")
 
             self.log_signal.emit("Starting detection...", "info")
-            cap = cv2.VideoCapture(CAMERA_IND)
-            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-
-            if not cap.isOpened():
+            if not self.capture.connected:
+                self.plc.send_fault(PLC_FAULT_CAMERA)
                 self.error_signal.emit("Could not open camera feed")
                 return
 
             frame_count = single_circlip_frames = multiple_circlips_frames = no_circlip_frames = 0
+            reused_frames = 0
+            self.change_gate.reset()
+            # Only evaluate frames captured after the cycle started
+            last_seq, window_start = self.capture.ring.start_reading()
             start_time = time.time()
+            # The window is measured on frame timestamps, so replays at any speed see the same frames
+            window_elapsed = 0.0
 
-            while self.running and time.time() - start_time < 2:              #Detection time
-                ret, frame = cap.read()
-                if not ret:
+            while self.running and window_elapsed < DETECTION_WINDOW:
+                batch_size = min(INFERENCE_BATCH_SIZE, self.verdict_rule.remaining(frame_count))
+                stage_start = time.perf_counter()
+                last_seq, frames, timestamps = self.collect_batch(last_seq, batch_size)
+                if not frames:
                     self.error_signal.emit("Failed to read frame")
                     break
-
-                rgb_image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = rgb_image.shape
-                qt_image = QImage(rgb_image.data, w, h, QImage.Format_RGB888)
-                self.frame_signal.emit(qt_image)
+                report_stage(self.stage_observer, "frame_read", stage_start)
 
                 detection_start = time.time()
-                results = model.predict(frame, device='cuda', dnn=True)
-                self.processing_times.append(time.time() - detection_start)
+                stage_start = time.perf_counter()
+                # Reused results are copies, not independent samples, so nothing is reused
+                # while early exit may still settle the verdict on these tallies
+                to_infer, sources = self.change_gate.plan(frames, reuse=not self.verdict_rule.enabled)
+                report_stage(self.stage_observer, "preprocess", stage_start)
+                stage_start = time.perf_counter()
+                inferred = self.model_service.predict(to_infer) if to_infer else []
+                if to_infer:
+                    report_stage(self.stage_observer, "inference", stage_start)
+                results = self.change_gate.expand(inferred, sources)
+                reused_frames += len(frames) - len(to_infer)
+                # Keep the per-frame average so the displayed time stays comparable
+                self.processing_times.append((time.time() - detection_start) / len(frames))
 
-                for result in results:
-                    num_circlips = len(result.boxes)
+                if self.preview:
+                    self.preview.show_detections(results[-1])
+
+                stage_start = time.perf_counter()
+                for boxes in results:
+                    num_circlips = len(boxes)
                     if num_circlips == 1:
                         single_circlip_frames += 1
                     elif num_circlips > 1:
@@ -107,27 +2417,48 @@ class DetectionThread(QThread):
                     else:
                         no_circlip_frames += 1
 
-                frame_count += 1
+                frame_count += len(frames)
+                if window_start is None:
+                    window_start = timestamps[0]
+                window_elapsed = timestamps[-1] - window_start
+                last_frame, last_boxes = frames[-1], results[-1]
                 # QThread.msleep(30)            # for smooth video
 
-            cap.release()
+                settled = self.verdict_rule.should_stop(single_circlip_frames, frame_count)
+                report_stage(self.stage_observer, "verdict", stage_start)
+                if settled:
+                    self.log_signal.emit(
+                        f"Verdict settled after {frame_count} frames ({time.time() - start_time:.2f}s)", "info")
+                    break
+
+            if reused_frames:
+                self.log_signal.emit(f"{reused_frames} of {frame_count} frames unchanged, previous result reused", "info")
 
+            self.frame_count = frame_count
             if frame_count == 0:
+                self.plc.send_fault(PLC_FAULT_NO_FRAMES)
                 self.error_signal.emit("No frames processed")
                 return
 
             single_percent = (single_circlip_frames / frame_count) * 100
             multiple_percent = (multiple_circlips_frames / frame_count) * 100
             none_percent = (no_circlip_frames / frame_count) * 100
-            result = "YES" if single_percent >= 60 else "NO"
+            result = "YES" if single_percent >= SINGLE_PASS_PERCENT else "NO"
 
             if result == "NO":
                 self.play_error_sound()
                 self.log_signal.emit("Circlip missing/incorrect", "error")
 
+            # Frames actually evaluated per second of inspection, not the preview rate
+            self.frames_per_second = frame_count / max(time.time() - start_time, 1e-6)
+            stage_start = time.perf_counter()
+            qt_image = frame_to_qimage(last_frame, last_boxes, self.model_service.roi)
+            report_stage(self.stage_observer, "color_convert", stage_start)
             self.store_result(single_percent, multiple_percent, none_percent, result)
-            self.send_to_plc(result)
+            self.send_to_plc(result, single_percent)
+            report_stage(self.stage_observer, "cycle", cycle_start)
 
+            stage_start = time.perf_counter()
             self.update_signal.emit(
                 "Detection complete", 
                 single_percent, 
@@ -136,105 +2467,309 @@ class DetectionThread(QThread):
                 result,
                 qt_image
             )
+            report_stage(self.stage_observer, "preview_emit", stage_start)
+
+        except Exception as e:
+            self.plc.send_fault(PLC_FAULT_ERROR)
+            self.error_signal.emit(f"Error: {str(e)}")
+            self.play_error_sound()
+
+    def collect_batch(self, last_seq, batch_size=INFERENCE_BATCH_SIZE):
+        """Gather up to batch_size new frames, waiting at most BATCH_MAX_WAIT once one arrived"""
+        ring = self.capture.ring
+        last_seq, frames, timestamps = ring.wait_frames(last_seq, batch_size)
+        if not frames:
+            return last_seq, frames, timestamps
+
+        deadline = time.time() + BATCH_MAX_WAIT
+        while self.running and len(frames) < batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            last_seq, more, more_timestamps = ring.wait_frames(last_seq, batch_size - len(frames), remaining)
+            frames.extend(more)
+            timestamps.extend(more_timestamps)
+        return last_seq, frames, timestamps
+
+    def store_result(self, single, multiple, none, result):
+        # Queued for the background writer so the PLC write never waits on MySQL
+        self.result_writer.submit(single, multiple, none, result)
+        self.log_signal.emit(f"Result queued for database: {result}", "info")
+
+    def send_to_plc(self, result, single_percent):
+        # Queued for the PLC worker, which logs the write once it went out
+        self.plc.send_result(result, single_percent)
+        if not self.plc.connected:
+            self.log_signal.emit("PLC not connected, result will be sent on reconnect", "warning")
+
+    def play_error_sound(self):
+        try:
+            winsound.Beep(1000, 1000)
+        except:
+            pass
+
+class PLCTrigger:
+    """Fires on the rising edge of the PLC trigger register
+
+    The register is read by the PLCWorker heartbeat, which also acknowledges it.
+    """
+    name = "PLC"
+
+    def arm(self, worker):
+        worker.plc.set_trigger_armed(True)
+
+    def disarm(self, worker):
+        worker.plc.set_trigger_armed(False)
+
+    def poll(self, worker):
+        return worker.plc.take_trigger()
+
+class PartPresenceTrigger:
+    """Fires once when a part settles in the fixture, re-arms when the fixture is empty again
+
+    The empty fixture is the frame taught with Teach Empty, kept in
+    PRESENCE_REFERENCE_FILE, and follows slow lighting drift while no part is
+    present. After arming nothing fires until the fixture has been seen empty,
+    so a part already seated is not inspected.
+    """
+    name = "part presence"
+
+    def __init__(self, capture, roi, threshold=PRESENCE_THRESHOLD, settle_frames=PRESENCE_SETTLE_FRAMES,
+                 reference_file=PRESENCE_REFERENCE_FILE):
+        self.capture = capture
+        self.roi = roi
+        self.threshold = threshold
+        self.settle_frames = settle_frames
+        self.reference_file = reference_file
+        self.background = None
+        self.previous = None
+        self.present = False
+        self.settled = 0
+        self.last_seq = 0
+
+    def thumbnail(self, frame):
+        small = cv2.resize(self.roi.crop(frame), FRAME_DIFF_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def load_reference(self):
+        """Thumbnail of the taught empty fixture, or None if none was taught"""
+        if not os.path.exists(self.reference_file):
+            return None
+        frame = cv2.imread(self.reference_file)
+        if frame is None:
+            return None
+        return self.thumbnail(frame).astype(np.float32)
+
+    def arm(self, worker):
+        self.background = self.load_reference()
+        self.previous = None
+        self.settled = 0
+        # Treat the fixture as occupied until it has been seen empty
+        self.present = True
+
+    def disarm(self, worker):
+        pass
+
+    def poll(self, worker):
+        if self.background is None:
+            raise RuntimeError(f"No empty fixture taught ({self.reference_file}), use Teach Empty")
+        self.last_seq, frame = self.capture.ring.latest(self.last_seq)
+        if frame is None:
+            return False
+        thumb = self.thumbnail(frame)
+        if self.previous is None:
+            self.previous = thumb
+            return False
+
+        moving = cv2.absdiff(thumb, self.previous).mean() >= FRAME_DIFF_THRESHOLD
+        self.previous = thumb
+        self.settled = 0 if moving else self.settled + 1
+        if self.settled < self.settle_frames:
+            return False
+
+        occupied = cv2.absdiff(thumb, self.background.astype(np.uint8)).mean() >= self.threshold
+        if occupied and not self.present:
+            self.present = True
+            return True
+        if not occupied:
+            self.present = False
+            cv2.accumulateWeighted(thumb.astype(np.float32), self.background, 0.05)
+        return False
+
+class AutoInspectionThread(DetectionThread):
+    """Persistent worker that runs an inspection cycle for every trigger, without the operator"""
+
+    def __init__(self, plc, result_writer, model_service, capture, trigger, preview=None, stage_observer=None):
+        super().__init__(plc, result_writer, model_service, capture, preview, stage_observer)
+        self.trigger = trigger
+
+    def run(self):
+        self.trigger.arm(self)
+        self.log_signal.emit(f"Automatic inspection armed ({self.trigger.name} trigger)", "info")
+        trigger_error = None
+        while self.running:
+            try:
+                fired = self.trigger.poll(self)
+                trigger_error = None
+            except Exception as e:
+                fired = False
+                # Log a failing trigger once, not on every poll
+                if str(e) != trigger_error:
+                    trigger_error = str(e)
+                    self.log_signal.emit(f"Trigger error: {e}", "error")
+
+            if fired:
+                self.log_signal.emit("Part detected, starting inspection", "info")
+                self.run_cycle()
+            else:
+                self.msleep(int(AUTO_TRIGGER_POLL_INTERVAL * 1000))
+        self.trigger.disarm(self)
+        self.log_signal.emit("Automatic inspection stopped", "info")
+
+class ModelLoaderThread(QThread):
+    """Loads and warms up the model while the window is already responsive"""
+    log_signal = pyqtSignal(str, str)
+    loaded_signal = pyqtSignal(float)  # seconds spent loading
+
+    def __init__(self, model_service):
+        super().__init__()
+        self.model_service = model_service
 
+    def run(self):
+        started = time.perf_counter()
+        try:
+            self.log_signal.emit("Loading YOLO model...", "info")
+            self.model_service.reload_if_changed()
+            if self.model_service.fallback_reason:
+                self.log_signal.emit(self.model_service.fallback_reason, "warning")
+            self.log_signal.emit(f"YOLO model loaded and warmed up ({self.model_service.backend.name})", "info")
         except Exception as e:
-            self.error_signal.emit(f"Error: {str(e)}")
-            self.play_error_sound()
+            self.log_signal.emit(f"Model load failed: {e}", "error")
+        self.loaded_signal.emit(time.perf_counter() - started)
 
-    def store_result(self, single, multiple, none, result):
+class StartupProfiler:
+    """Wall-clock time of each startup phase, printed with --profile-startup"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = [("imports", STARTUP_IMPORTS_DONE - STARTUP_STARTED)]
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
         try:
-            if not self.db_connection.is_connected():
-                self.db_connection.reconnect()
-                
-            cursor = self.db_connection.cursor()
-            query = """
-                INSERT INTO detection_results (
-                    single_circlip_percentage, 
-                    multiple_circlips_percentage, 
-                    no_circlip_percentage, 
-                    result
-                ) VALUES (%s, %s, %s, %s)
-            """
-            values = (single, multiple, none, result)
-            cursor.execute(query, values)
-            self.db_connection.commit()
-            self.log_signal.emit(f"Result stored in database: {result}", "info")
-        except mysql.connector.Error as e:
-            self.log_signal.emit(f"Database error: {e}", "error")
-            try:
-                self.db_connection.reconnect()
-                cursor = self.db_connection.cursor()
-                cursor.execute(query, values)
-                self.db_connection.commit()
-                self.log_signal.emit("Retry successful - result stored", "info")
-            except Exception as retry_error:
-                self.log_signal.emit(f"Failed to store after retry: {retry_error}", "error")
+            yield
         finally:
-            if 'cursor' in locals():
-                cursor.close()
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("Startup profile:")
+        for name, seconds in self.phases:
+            print(f"  {name:<28} {seconds * 1000:9.1f} ms")
+        print(f"  {'total since launch':<28} {(time.perf_counter() - STARTUP_STARTED) * 1000:9.1f} ms")
+        sys.stdout.flush()
 
-    def send_to_plc(self, result):
-        if self.plc_socket:
+def logo_cache_path(name):
+    return os.path.join(LOGO_CACHE_DIR, f"{name}.png")
+
+class LogoFetchThread(QThread):
+    """Downloads logos missing from LOGO_CACHE_DIR and caches them as PNG
+
+    Runs off the GUI thread, so an offline plant network never delays startup;
+    once a logo is cached it is never fetched again.
+    """
+    logo_signal = pyqtSignal(str, str)  # logo name, cached file path
+    log_signal = pyqtSignal(str, str)
+
+    def __init__(self, logos):
+        super().__init__()
+        self.logos = logos  # (name, url)
+
+    def run(self):
+        import requests
+        from PIL import Image
+        
+        for name, url in self.logos:
             try:
-                value = 1 if result == "YES" else 0
-                write_status = mc.write_sign_word(self.plc_socket, 'D1', [value], False)
-                if write_status:
-                    self.log_signal.emit(f"Sent to PLC D1: {value}", "info")
-                else:
-                    self.log_signal.emit("Failed to write to PLC D1", "error")
+                response = requests.get(url, timeout=LOGO_FETCH_TIMEOUT)
+                response.raise_for_status()
+                img = Image.open(BytesIO(response.content))
+                if img.mode not in ('RGB', 'RGBA'):
+                    img = img.convert('RGBA')
+                    
+                os.makedirs(LOGO_CACHE_DIR, exist_ok=True)
+                path = logo_cache_path(name)
+                # Written aside first so a half-saved file is never picked up
+                img.save(path + ".part", format='PNG')
+                os.replace(path + ".part", path)
+                self.logo_signal.emit(name, path)
             except Exception as e:
-                self.log_signal.emit(f"PLC error: {e}", "error")
-
-    def play_error_sound(self):
-        try:
-            winsound.Beep(1000, 1000)
-        except:
-            pass
+                self.log_signal.emit(f"Could not fetch {name.replace('_', ' ')}: {e}", "warning")
 
 class DetectionUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, profiler=None, capture_source=CAPTURE_SOURCE):
         super().__init__()
         self.setWindowTitle("Circlip Detection System")
         self.setMinimumSize(1200, 800)
         
         # Initialize detection_thread as None
         self.detection_thread = None
-        
-        # Set window icon (logo in title bar)
-        self.load_window_icon()
+        self.csv_export_thread = None
+        self.pdf_report_thread = None
+        self.logo_thread = None
+        self.model_loader = None
+        self.plc = None
+        self.metrics_server = None
+        self.auto_mode = False
+        self.profiler = profiler or StartupProfiler()
+        self.capture_source = capture_source
+        # Reported once the services, the model load and the first PLC attempt are done
+        self.startup_pending = 3
+        self.model_service = ModelService(MODEL_PATH)
+        # Connections are opened lazily, so the tables' models can share the pool
+        self.db_pool = DatabasePool(DB_CONFIG)
+        # Every pipeline worker reports its stage timings here
+        self.metrics = PipelineMetrics()
         
         # Initialize UI first
-        self.init_ui()
-        self.load_logo()
-        self.add_alert_system()
-        
-        # Now initialize connections
-        self.db_connection = self.connect_database()
-        self.create_table()
-        self.plc_socket = self.connect_plc()
+        with self.profiler.phase("ui"):
+            self.init_ui()
+            self.load_logos()
+            self.add_alert_system()
+        
+        # The model loads in the background; connections are made once the window is up
+        self.load_model()
+        QTimer.singleShot(0, self.start_services)
+
+    def start_services(self):
+        """Connect the database and PLC and start the capture, after the window is shown"""
+        with self.profiler.phase("db connect"):
+            self.connect_database()
+        with self.profiler.phase("table create"):
+            self.migrate_schema()
+        self.start_result_writer()
+        self.start_plc()
+        with self.profiler.phase("capture start"):
+            self.start_capture()
+        self.start_metrics_server()
         
         # Initial system status
         self.log_message("System initialized", "info")
-        if self.db_connection and self.db_connection.is_connected():
-            self.load_today_summary()
-
-    def load_window_icon(self):
-        """Load company logo as window icon"""
-        try:
-            response = requests.get(TITLE_LOGO_URL, timeout=5)
-            img = Image.open(BytesIO(response.content))
-            
-            # Convert to bytes
-            img_byte_arr = BytesIO()
-            img.save(img_byte_arr, format='PNG')
+        self.load_today_summary()
             
-            # Create QIcon from bytes
-            qimg = QImage()
-            qimg.loadFromData(img_byte_arr.getvalue())
-            pixmap = QPixmap.fromImage(qimg)
-            self.setWindowIcon(QIcon(pixmap))
-        except Exception as e:
-            self.log_message(f"Could not load window icon: {e}", "warning")
+        if AUTO_MODE_ON_STARTUP:
+            self.auto_button.setChecked(True)
+        self.startup_phase_done()
+
+    def startup_phase_done(self):
+        self.startup_pending -= 1
+        if not self.startup_pending:
+            self.profiler.report()
 
     def init_ui(self):
         """Initialize all UI components"""
@@ -335,6 +2870,50 @@ class DetectionUI(QMainWindow):
         self.try_again_button.clicked.connect(self.try_again_detection)
         button_layout.addWidget(self.try_again_button)
         
+        self.auto_button = QPushButton("Auto Mode")
+        self.auto_button.setCheckable(True)
+        self.auto_button.setStyleSheet("""
+            QPushButton {
+                font-size: 16px; 
+                padding: 10px;
+                background-color: #8e44ad;
+                color: white;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #71368a;
+            }
+            QPushButton:checked {
+                background-color: #27ae60;
+            }
+            QPushButton:disabled {
+                background-color: #95a5a6;
+            }
+        """)
+        self.auto_button.toggled.connect(self.toggle_auto_mode)
+        button_layout.addWidget(self.auto_button)
+        
+        self.teach_button = QPushButton("Teach Empty")
+        self.teach_button.setStyleSheet("""
+            QPushButton {
+                font-size: 16px; 
+                padding: 10px;
+                background-color: #16a085;
+                color: white;
+                border-radius: 5px;
+            }
+            QPushButton:hover {
+                background-color: #138d75;
+            }
+            QPushButton:disabled {
+                background-color: #95a5a6;
+            }
+        """)
+        self.teach_button.setToolTip("Store the current camera frame as the empty fixture")
+        self.teach_button.clicked.connect(self.teach_empty_fixture)
+        self.teach_button.setVisible(AUTO_TRIGGER == "presence")
+        button_layout.addWidget(self.teach_button)
+        
         left_panel.addLayout(button_layout)
         content_layout.addLayout(left_panel, 2)
         
@@ -431,9 +3010,15 @@ class DetectionUI(QMainWindow):
         
         # Statistics table
         stats_group = QGroupBox("Today's Statistics")
-        self.stats_table = QTableWidget()
-        self.stats_table.setColumnCount(4)
-        self.stats_table.setHorizontalHeaderLabels(["Time", "Result", "Single %", "Multiple %"])
+        self.stats_model = DetectionTableModel(self.db_pool, [
+            ("Time", 'time', "{}"),
+            ("Result", 'result', "{}"),
+            ("Single %", 'single', "{:.1f}%"),
+            ("Multiple %", 'multiple', "{:.1f}%"),
+        ])
+        self.stats_model.log_signal.connect(self.log_message)
+        self.stats_table = QTableView()
+        self.stats_table.setModel(self.stats_model)
         self.stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         stats_group.setLayout(QVBoxLayout())
         stats_group.layout().addWidget(self.stats_table)
@@ -511,13 +3096,20 @@ class DetectionUI(QMainWindow):
         
         # Date selection
         date_layout = QHBoxLayout()
-        date_layout.addWidget(QLabel("Select Date:"))
+        date_layout.addWidget(QLabel("From:"))
         
         self.date_edit = QTextEdit()
         self.date_edit.setMaximumHeight(30)
         self.date_edit.setPlaceholderText("YYYY-MM-DD")
         date_layout.addWidget(self.date_edit)
         
+        date_layout.addWidget(QLabel("To:"))
+        
+        self.date_to_edit = QTextEdit()
+        self.date_to_edit.setMaximumHeight(30)
+        self.date_to_edit.setPlaceholderText("YYYY-MM-DD (optional)")
+        date_layout.addWidget(self.date_to_edit)
+        
         search_button = QPushButton("Search")
         search_button.clicked.connect(self.load_history)
         date_layout.addWidget(search_button)
@@ -525,9 +3117,16 @@ class DetectionUI(QMainWindow):
         history_layout.addLayout(date_layout)
         
         # History table
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(5)
-        self.history_table.setHorizontalHeaderLabels(["Timestamp", "Result", "Single %", "Multiple %", "No Circlip %"])
+        self.history_model = DetectionTableModel(self.db_pool, [
+            ("Timestamp", 'timestamp', "{}"),
+            ("Result", 'result', "{}"),
+            ("Single %", 'single', "{:.1f}%"),
+            ("Multiple %", 'multiple', "{:.1f}%"),
+            ("No Circlip %", 'none', "{:.1f}%"),
+        ])
+        self.history_model.log_signal.connect(self.log_message)
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
         self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         history_layout.addWidget(self.history_table)
         
@@ -569,10 +3168,33 @@ class DetectionUI(QMainWindow):
         
         history_tab.setLayout(history_layout)
         
+        # Metrics tab
+        self.metrics_tab = QWidget()
+        metrics_tab_layout = QVBoxLayout()
+        
+        self.metrics_info_label = QLabel(f"Stage timings over the last {METRICS_WINDOW:g} seconds")
+        metrics_tab_layout.addWidget(self.metrics_info_label)
+        
+        self.metrics_table = QTableWidget(len(PipelineMetrics.STAGES), 6)
+        self.metrics_table.setHorizontalHeaderLabels(
+            ["Stage", "Samples", "Per second", "p50 (ms)", "p95 (ms)", "p99 (ms)"])
+        self.metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.metrics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        metrics_tab_layout.addWidget(self.metrics_table)
+        
+        self.metrics_tab.setLayout(metrics_tab_layout)
+        
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        self.metrics_timer.start(int(METRICS_REFRESH_INTERVAL * 1000))
+        
         # Add tabs
         self.tab_widget.addTab(detection_tab, "Detection")
         self.tab_widget.addTab(summary_tab, "Today's Summary")
         self.tab_widget.addTab(history_tab, "History")
+        self.tab_widget.addTab(self.metrics_tab, "Metrics")
+        self.tab_widget.currentChanged.connect(self.refresh_metrics)
         
         main_layout.addWidget(self.tab_widget)
         main_widget.setLayout(main_layout)
@@ -591,26 +3213,75 @@ class DetectionUI(QMainWindow):
 
     def start_detection(self):
         """Start detection process"""
-        if not self.db_connection or not self.db_connection.is_connected():
-            self.db_connection = self.connect_database()
-            if not self.db_connection:
-                self.log_message("Cannot start detection - no database connection", "error")
-                return
-                
+        # Results are spooled locally while the database is down, so it is not required here
         self.log_display.clear()
         self.detect_button.setEnabled(False)
         self.stop_button.setEnabled(True)
         self.try_again_button.setEnabled(False)
+        # Auto Mode can only be armed once the manual cycle is over
+        self.auto_button.setEnabled(False)
         self.result_label.setText("Status: Detecting...")
         
-        self.detection_thread = DetectionThread(self.plc_socket, self.db_connection)
-        self.detection_thread.update_signal.connect(self.update_display)
-        self.detection_thread.error_signal.connect(self.handle_error)
-        self.detection_thread.log_signal.connect(self.log_message)
-        self.detection_thread.frame_signal.connect(self.update_frame)
-        self.detection_thread.alert_signal.connect(self.trigger_alert)
+        self.detection_thread = DetectionThread(
+            self.plc, self.result_writer, self.model_service, self.capture, self.preview, self.metrics)
+        self.connect_detection_signals(self.detection_thread)
+        self.detection_thread.finished.connect(self.manual_cycle_finished)
         self.detection_thread.start()
 
+    def manual_cycle_finished(self):
+        self.auto_button.setEnabled(True)
+
+    def connect_detection_signals(self, thread):
+        """Route a detection worker's signals to the UI"""
+        thread.update_signal.connect(self.update_display)
+        thread.error_signal.connect(self.handle_error)
+        thread.log_signal.connect(self.log_message)
+        thread.alert_signal.connect(self.trigger_alert)
+
+    def toggle_auto_mode(self, enabled):
+        """Switch hands-free inspection on or off"""
+        if enabled:
+            self.start_auto_mode()
+        elif self.auto_mode:
+            self.stop_detection()
+
+    def start_auto_mode(self):
+        """Run inspections on PLC or part-presence triggers using one persistent worker"""
+        if AUTO_TRIGGER == "plc":
+            trigger = PLCTrigger()
+        else:
+            trigger = PartPresenceTrigger(self.capture, self.model_service.roi)
+
+        self.auto_mode = True
+        self.detect_button.setEnabled(False)
+        self.teach_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.try_again_button.setEnabled(False)
+        self.result_label.setText("Status: Waiting for part...")
+
+        self.detection_thread = AutoInspectionThread(
+            self.plc, self.result_writer, self.model_service, self.capture, trigger, self.preview,
+            self.metrics)
+        self.connect_detection_signals(self.detection_thread)
+        self.detection_thread.start()
+
+    def teach_empty_fixture(self):
+        """Store the current camera frame as the empty fixture for the part-presence trigger"""
+        _, frame = self.capture.ring.latest()
+        if frame is None:
+            self.log_message("No camera frame to teach the empty fixture from", "error")
+            return
+        if not cv2.imwrite(PRESENCE_REFERENCE_FILE, frame):
+            self.log_message(f"Could not write {PRESENCE_REFERENCE_FILE}", "error")
+            return
+        self.log_message("Empty fixture taught", "info")
+
+    def set_auto_button(self, checked):
+        """Update the Auto Mode button without re-triggering toggle_auto_mode"""
+        self.auto_button.blockSignals(True)
+        self.auto_button.setChecked(checked)
+        self.auto_button.blockSignals(False)
+
     def stop_detection(self):
         """Stop detection process"""
         if hasattr(self, 'detection_thread') and self.detection_thread is not None:
@@ -618,57 +3289,25 @@ class DetectionUI(QMainWindow):
             self.detection_thread.wait()
             self.detection_thread = None
             
+        self.auto_mode = False
+        self.set_auto_button(False)
         self.detect_button.setEnabled(True)
+        self.teach_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.log_message("Detection stopped", "info")
 
     def try_again_detection(self):
         """Delete last record and start new detection"""
-        if not self.db_connection or not self.db_connection.is_connected():
-            self.db_connection = self.connect_database()
-            if not self.db_connection:
-                self.log_message("Cannot try again - no database connection", "error")
-                return
-    
-        try:
-            cursor = self.db_connection.cursor()
-            # Get the ID of the last record
-            cursor.execute("SELECT id FROM detection_results ORDER BY id DESC LIMIT 1")
-            last_id = cursor.fetchone()
-            
-            if last_id:
-                # Delete the last record
-                cursor.execute("DELETE FROM detection_results WHERE id = %s", (last_id[0],))
-                self.db_connection.commit()
-                self.log_message(f"Deleted last record (ID: {last_id[0]})", "info")
-                
-                # Update the summary display
-                self.load_today_summary()
-                
-                # Start new detection immediately
-                self.start_detection()
-                
-        except mysql.connector.Error as e:
-            self.log_message(f"Database error during try again: {e}", "error")
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
+        # The writer applies the delete in order, even if the record is still queued or spooled
+        self.result_writer.discard_last()
+        self.start_detection()
 
     def update_frame(self, image):
         """Update camera display"""
-        pixmap = QPixmap.fromImage(image)
-        self.camera_label.setPixmap(pixmap.scaled(
-            self.camera_label.width(), 
-            self.camera_label.height(), 
-            Qt.KeepAspectRatio
-        ))
-        
-        # Update FPS
-        current_time = time.time()
-        if hasattr(self, 'last_frame_time'):
-            fps = 1 / (current_time - self.last_frame_time)
-            self.fps_label.setText(f"FPS: {fps:.1f}")
-        self.last_frame_time = current_time
+        # The preview thread already scaled the frame to the label
+        self.camera_label.setPixmap(QPixmap.fromImage(image))
+        self.preview.set_target_size(self.camera_label.width(), self.camera_label.height())
+        self.preview.frame_consumed()
 
     def update_display(self, status, single, multiple, none, result, image):
         """Update UI with detection results"""
@@ -679,7 +3318,7 @@ class DetectionUI(QMainWindow):
         else:
             self.result_label.setStyleSheet("font-size: 18px; font-weight: bold; color: red;")
             self.result_label.setText("Status: Circlip missing")
-            self.try_again_button.setEnabled(True)
+            self.try_again_button.setEnabled(not self.auto_mode)
             
         self.timestamp_label.setText(f"Last update: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
@@ -687,15 +3326,22 @@ class DetectionUI(QMainWindow):
             avg_time = np.mean(self.detection_thread.processing_times) * 1000
             self.processing_time_label.setText(f"Processing Time: {avg_time:.1f} ms")
         
-        self.detect_button.setEnabled(True)
-        self.stop_button.setEnabled(False)
-        self.load_today_summary()
+        # Frames evaluated per second during the cycle, not the preview rate
+        if getattr(self.detection_thread, 'frames_per_second', None):
+            self.fps_label.setText(f"FPS: {self.detection_thread.frames_per_second:.1f}")
+        
+        if not self.auto_mode:
+            self.detect_button.setEnabled(True)
+            self.stop_button.setEnabled(False)
 
     def handle_error(self, error_message):
         """Handle detection errors"""
         self.log_message(error_message, "error")
         self.result_label.setStyleSheet("font-size: 18px; font-weight: bold; color: red;")
         self.result_label.setText("Status: Error occurred")
+        if self.auto_mode:
+            # The auto worker keeps waiting for the next part
+            return
         self.detect_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.try_again_button.setEnabled(False)
@@ -723,370 +3369,202 @@ class DetectionUI(QMainWindow):
 
     def export_to_csv(self):
         """Export today's results to CSV file"""
-        if not self.db_connection or not self.db_connection.is_connected():
-            self.log_message("Database not connected", "error")
+        today = date.today().strftime('%Y-%m-%d')
+        self.start_csv_export(*day_range(today), f"circlip_results_{today}.csv")
+
+    def start_csv_export(self, start, end, default_name):
+        """Ask for a file and stream [start, end) into it on a worker thread"""
+        if self.csv_export_thread is not None and self.csv_export_thread.isRunning():
+            self.log_message("A CSV export is already running", "warning")
             return
-        
-        try:
-            today = date.today().strftime('%Y-%m-%d')
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT timestamp, result, 
-                       single_circlip_percentage as single, 
-                       multiple_circlips_percentage as multiple,
-                       no_circlip_percentage as none
-                FROM detection_results 
-                WHERE DATE(timestamp) = %s
-                ORDER BY timestamp DESC
-            """, (today,))
-            
-            detections = cursor.fetchall()
-            cursor.close()
-            
-            if not detections:
-                self.log_message("No data to export", "warning")
-                return
-            
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Save CSV File",
-                f"circlip_results_{today}.csv",
-                "CSV Files (*.csv)"
-            )
-            
-            if not file_path:
-                return
-            
-            with open(file_path, mode='w', newline='') as csv_file:
-                fieldnames = ['timestamp', 'result', 'single', 'multiple', 'none']
-                writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(detections)
             
-            self.log_message(f"Results exported to {file_path}", "info")
-            
-        except Exception as e:
-            self.log_message(f"CSV export failed: {e}", "error")
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Save CSV File",
+            default_name,
+            "CSV Files (*.csv)"
+        )
+        
+        if not file_path:
+            return
+        
+        # Not modal, so the station stays usable while a long range exports
+        self.csv_export_progress = QProgressDialog("Exporting CSV...", "Cancel", 0, 0, self)
+        self.csv_export_progress.setWindowTitle("CSV Export")
+        self.csv_export_progress.setMinimumDuration(0)
+        self.csv_export_progress.setAutoClose(False)
+        self.csv_export_progress.setAutoReset(False)
+        
+        self.csv_export_thread = CsvExportThread(self.db_pool, start, end, file_path)
+        self.csv_export_thread.log_signal.connect(self.log_message)
+        self.csv_export_thread.progress_signal.connect(self.update_csv_export_progress)
+        self.csv_export_thread.finished_signal.connect(self.csv_export_finished)
+        self.csv_export_progress.canceled.connect(self.csv_export_thread.cancel)
+        self.csv_export_thread.start()
+        self.csv_export_progress.show()
+
+    def update_csv_export_progress(self, written, expected):
+        self.csv_export_progress.setMaximum(expected)
+        self.csv_export_progress.setValue(written)
+        self.csv_export_progress.setLabelText(f"Exported {written} of {expected} rows...")
+
+    def csv_export_finished(self, file_path, written):
+        self.csv_export_progress.close()
+        if written > 0:
+            self.log_message(f"{written} results exported to {file_path}", "info")
+        elif written == 0:
+            self.log_message("No data to export", "warning")
 
     def export_to_pdf(self):
         """Export today's results to PDF report"""
-        if not self.db_connection or not self.db_connection.is_connected():
-            self.log_message("Database not connected", "error")
+        today = date.today().strftime('%Y-%m-%d')
+        self.start_pdf_report(*day_range(today), "Circlip Detection Report", today,
+                              f"circlip_report_{today}.pdf")
+
+    def start_pdf_report(self, start, end, title, date_label, default_name):
+        """Ask for a file and build the report for [start, end) on a worker thread"""
+        if self.pdf_report_thread is not None and self.pdf_report_thread.isRunning():
+            self.log_message("A PDF report is already being built", "warning")
             return
-        
-        try:
-            today = date.today().strftime('%Y-%m-%d')
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT timestamp, result, 
-                       single_circlip_percentage as single, 
-                       multiple_circlips_percentage as multiple,
-                       no_circlip_percentage as none
-                FROM detection_results 
-                WHERE DATE(timestamp) = %s
-                ORDER BY timestamp DESC
-            """, (today,))
-            
-            detections = cursor.fetchall()
-            cursor.close()
-            
-            if not detections:
-                self.log_message("No data to export", "warning")
-                return
-            
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Save PDF Report",
-                f"circlip_report_{today}.pdf",
-                "PDF Files (*.pdf)"
-            )
-            
-            if not file_path:
-                return
-            
-            # Create PDF document
-            doc = SimpleDocTemplate(file_path, pagesize=letter)
-            elements = []
-            
-            # Add title
-            styles = getSampleStyleSheet()
-            elements.append(Paragraph("Circlip Detection Report", styles['Title']))
-            elements.append(Paragraph(f"Date: {today}", styles['Normal']))
-            elements.append(Paragraph(" ", styles['Normal']))  # Spacer
-            
-            # Prepare data for table
-            data = [['Timestamp', 'Result', 'Single %', 'Multiple %', 'No Circlip %']]
-            for detection in detections:
-                data.append([
-                    str(detection['timestamp']),
-                    detection['result'],
-                    f"{detection['single']:.1f}",
-                    f"{detection['multiple']:.1f}",
-                    f"{detection['none']:.1f}"
-                ])
             
-            # Create table
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            elements.append(table)
-            
-            # Summary statistics
-            passed = sum(1 for d in detections if d['result'] == "YES")
-            failed = len(detections) - passed
-            elements.append(Paragraph(" ", styles['Normal']))  # Spacer
-            elements.append(Paragraph(f"Total Detections: {len(detections)}", styles['Normal']))
-            elements.append(Paragraph(f"Passed: {passed}", styles['Normal']))
-            elements.append(Paragraph(f"Failed: {failed}", styles['Normal']))
-            
-            # Build PDF
-            doc.build(elements)
-            self.log_message(f"PDF report saved to {file_path}", "info")
-            
-        except Exception as e:
-            self.log_message(f"PDF export failed: {e}", "error")
-
-    def export_history_to_csv(self):
-        """Export historical data to CSV file"""
-        if not self.db_connection or not self.db_connection.is_connected():
-            self.log_message("Database not connected", "error")
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Save PDF Report",
+            default_name,
+            "PDF Files (*.pdf)"
+        )
+        
+        if not file_path:
             return
         
+        self.pdf_report_thread = PdfReportThread(self.db_pool, start, end, file_path, title, date_label)
+        self.pdf_report_thread.log_signal.connect(self.log_message)
+        self.pdf_report_thread.finished_signal.connect(self.pdf_report_finished)
+        self.pdf_report_thread.start()
+        self.log_message(f"Building PDF report for {date_label}...", "info")
+
+    def pdf_report_finished(self, file_path, written):
+        if written > 0:
+            self.log_message(f"PDF report with {written} results saved to {file_path}", "info")
+        elif written == 0:
+            self.log_message("No data to export", "warning")
+
+    def export_history_to_csv(self):
+        """Export the selected history range to CSV file"""
         try:
-            selected_date = self.date_edit.toPlainText().strip()
-            if not selected_date:
-                selected_date = date.today().strftime('%Y-%m-%d')
-                
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT timestamp, result, 
-                       single_circlip_percentage as single, 
-                       multiple_circlips_percentage as multiple,
-                       no_circlip_percentage as none
-                FROM detection_results 
-                WHERE DATE(timestamp) = %s
-                ORDER BY timestamp DESC
-            """, (selected_date,))
-            
-            detections = cursor.fetchall()
-            cursor.close()
-            
-            if not detections:
-                self.log_message("No data to export", "warning")
-                return
-            
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Save CSV File",
-                f"circlip_history_{selected_date}.csv",
-                "CSV Files (*.csv)"
-            )
-            
-            if not file_path:
-                return
-            
-            with open(file_path, mode='w', newline='') as csv_file:
-                fieldnames = ['timestamp', 'result', 'single', 'multiple', 'none']
-                writer = csv.DictWriter(csv_file, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(detections)
-            
-            self.log_message(f"History exported to {file_path}", "info")
-            
-        except Exception as e:
-            self.log_message(f"CSV export failed: {e}", "error")
+            start, end, label = self.selected_history_range()
+        except ValueError:
+            self.log_message("Invalid date range. Use YYYY-MM-DD", "warning")
+            return
+        self.start_csv_export(start, end, f"circlip_history_{label}.csv")
+
+    def selected_history_range(self):
+        """(start, end, label) for the From/To fields; raises ValueError for bad dates"""
+        first = self.date_edit.toPlainText().strip() or date.today().strftime('%Y-%m-%d')
+        last = self.date_to_edit.toPlainText().strip() or first
+        start, end = date_range(first, last)
+        label = first if last == first else f"{first}_to_{last}"
+        return start, end, label
 
     def export_history_to_pdf(self):
-        """Export historical data to PDF report"""
-        if not self.db_connection or not self.db_connection.is_connected():
-            self.log_message("Database not connected", "error")
-            return
-        
+        """Export the selected history range to PDF report"""
         try:
-            selected_date = self.date_edit.toPlainText().strip()
-            if not selected_date:
-                selected_date = date.today().strftime('%Y-%m-%d')
-                
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT timestamp, result, 
-                       single_circlip_percentage as single, 
-                       multiple_circlips_percentage as multiple,
-                       no_circlip_percentage as none
-                FROM detection_results 
-                WHERE DATE(timestamp) = %s
-                ORDER BY timestamp DESC
-            """, (selected_date,))
-            
-            detections = cursor.fetchall()
-            cursor.close()
-            
-            if not detections:
-                self.log_message("No data to export", "warning")
-                return
-            
-            file_path, _ = QFileDialog.getSaveFileName(
-                self,
-                "Save PDF Report",
-                f"circlip_history_{selected_date}.pdf",
-                "PDF Files (*.pdf)"
-            )
-            
-            if not file_path:
-                return
-            
-            # Create PDF document
-            doc = SimpleDocTemplate(file_path, pagesize=letter)
-            elements = []
-            
-            # Add title
-            styles = getSampleStyleSheet()
-            elements.append(Paragraph("Circlip Detection History Report", styles['Title']))
-            elements.append(Paragraph(f"Date: {selected_date}", styles['Normal']))
-            elements.append(Paragraph(" ", styles['Normal']))  # Spacer
-            
-            # Prepare data for table
-            data = [['Timestamp', 'Result', 'Single %', 'Multiple %', 'No Circlip %']]
-            for detection in detections:
-                data.append([
-                    str(detection['timestamp']),
-                    detection['result'],
-                    f"{detection['single']:.1f}",
-                    f"{detection['multiple']:.1f}",
-                    f"{detection['none']:.1f}"
-                ])
-            
-            # Create table
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            elements.append(table)
-            
-            # Summary statistics
-            passed = sum(1 for d in detections if d['result'] == "YES")
-            failed = len(detections) - passed
-            elements.append(Paragraph(" ", styles['Normal']))  # Spacer
-            elements.append(Paragraph(f"Total Detections: {len(detections)}", styles['Normal']))
-            elements.append(Paragraph(f"Passed: {passed}", styles['Normal']))
-            elements.append(Paragraph(f"Failed: {failed}", styles['Normal']))
-            
-            # Build PDF
-            doc.build(elements)
-            self.log_message(f"PDF history report saved to {file_path}", "info")
-            
-        except Exception as e:
-            self.log_message(f"PDF export failed: {e}", "error")
+            start, end, label = self.selected_history_range()
+        except ValueError:
+            self.log_message("Invalid date range. Use YYYY-MM-DD", "warning")
+            return
+        self.start_pdf_report(start, end, "Circlip Detection History Report", label.replace('_', ' '),
+                              f"circlip_history_{label}.pdf")
 
     def load_today_summary(self):
         """Load today's detection summary"""
-        if not self.db_connection or not self.db_connection.is_connected():
+        if not self.db_pool.available:
             return
             
         try:
-            today = date.today().strftime('%Y-%m-%d')
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT TIME(timestamp) as time, result, 
-                       single_circlip_percentage as single, 
-                       multiple_circlips_percentage as multiple
-                FROM detection_results 
-                WHERE DATE(timestamp) = %s
-                ORDER BY timestamp DESC
-            """, (today,))
+            today = date.today()
+            with self.db_pool.connection() as connection:
+                # Counters and newest id from one snapshot, so the table shows exactly the counted
+                # rows and later refreshes add the rest
+                connection.start_transaction(consistent_snapshot=True, readonly=True)
+                try:
+                    counts = rollup_totals(connection, *day_range(today))
+                    cursor = connection.cursor()
+                    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM detection_results")
+                    newest_id = cursor.fetchone()[0]
+                    cursor.close()
+                finally:
+                    connection.commit()
             
-            detections = cursor.fetchall()
-            cursor.close()
+            self.summary_day = today
+            self.summary_total = counts['total']
+            self.summary_passed = counts['passed']
+            self.stats_model.set_day(today, newest_id)
+            self.update_summary_counts()
             
-            self.stats_table.setRowCount(len(detections))
-            for row, detection in enumerate(detections):
-                self.stats_table.setItem(row, 0, QTableWidgetItem(str(detection['time'])))
-                self.stats_table.setItem(row, 1, QTableWidgetItem(detection['result']))
-                self.stats_table.setItem(row, 2, QTableWidgetItem(f"{detection['single']:.1f}%"))
-                self.stats_table.setItem(row, 3, QTableWidgetItem(f"{detection['multiple']:.1f}%"))
-                
-                # Color coding
-                color = Qt.green if detection['result'] == "YES" else Qt.red
-                for col in range(4):
-                    self.stats_table.item(row, col).setBackground(color)
+        except mysql.connector.Error as e:
+            self.log_message(f"Database error loading summary: {e}", "error")
+
+    def refresh_today_summary(self):
+        """Add only the rows stored since the last refresh"""
+        if not self.db_pool.available:
+            return
+        if getattr(self, 'summary_day', None) != date.today():
+            # First load, or the day rolled over
+            self.load_today_summary()
+            return
             
-            # Update summary counts
-            self.total_label.setText(str(len(detections)))
-            passed = sum(1 for d in detections if d['result'] == "YES")
-            self.passed_label.setText(str(passed))
-            self.failed_label.setText(str(len(detections) - passed))
+        try:
+            detections = self.stats_model.refresh()
+            for detection in detections:
+                self.count_summary_result(detection['result'], 1)
+            if detections:
+                self.update_summary_counts()
             
         except mysql.connector.Error as e:
             self.log_message(f"Database error loading summary: {e}", "error")
 
+    def count_summary_result(self, result, delta):
+        self.summary_total += delta
+        if result == "YES":
+            self.summary_passed += delta
+
+    def remove_summary_row(self, record_id):
+        """Drop a deleted record from today's table and counters"""
+        detection = self.stats_model.remove_record(record_id)
+        if detection is not None:
+            self.count_summary_result(detection['result'], -1)
+            self.update_summary_counts()
+
+    def update_summary_counts(self):
+        """Show the running passed/failed/total counters"""
+        self.total_label.setText(str(self.summary_total))
+        self.passed_label.setText(str(self.summary_passed))
+        self.failed_label.setText(str(self.summary_total - self.summary_passed))
+
     def load_history(self):
         """Load historical detection data"""
-        if not self.db_connection or not self.db_connection.is_connected():
+        if not self.db_pool.available:
             return
             
         try:
-            selected_date = self.date_edit.toPlainText().strip()
-            if not selected_date:
-                selected_date = date.today().strftime('%Y-%m-%d')
-                
-            cursor = self.db_connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT timestamp, result, 
-                       single_circlip_percentage as single, 
-                       multiple_circlips_percentage as multiple,
-                       no_circlip_percentage as none
-                FROM detection_results 
-                WHERE DATE(timestamp) = %s
-                ORDER BY timestamp DESC
-            """, (selected_date,))
-            
-            detections = cursor.fetchall()
-            cursor.close()
-            
-            self.history_table.setRowCount(len(detections))
-            for row, detection in enumerate(detections):
-                self.history_table.setItem(row, 0, QTableWidgetItem(str(detection['timestamp'])))
-                self.history_table.setItem(row, 1, QTableWidgetItem(detection['result']))
-                self.history_table.setItem(row, 2, QTableWidgetItem(f"{detection['single']:.1f}%"))
-                self.history_table.setItem(row, 3, QTableWidgetItem(f"{detection['multiple']:.1f}%"))
-                self.history_table.setItem(row, 4, QTableWidgetItem(f"{detection['none']:.1f}%"))
+            start, end, _ = self.selected_history_range()
                 
-                # Color coding
-                color = Qt.green if detection['result'] == "YES" else Qt.red
-                for col in range(5):
-                    self.history_table.item(row, col).setBackground(color)
+            # Rows are paged in by the model as the table scrolls
+            self.history_model.set_range(start, end)
                     
-        except mysql.connector.Error as e:
-            self.log_message(f"Database error loading history: {e}", "error")
         except ValueError:
-            self.log_message("Invalid date format. Use YYYY-MM-DD", "warning")
+            self.log_message("Invalid date range. Use YYYY-MM-DD", "warning")
 
     def connect_database(self):
-        """Establish database connection with proper error handling"""
+        """Check the database is reachable through the pool, creating it if needed"""
         try:
-            conn = mysql.connector.connect(**DB_CONFIG)
-            if conn.is_connected():
-                self.db_status_label.setText("Database: Connected")
-                self.db_status_label.setStyleSheet("color: green;")
-                self.log_message("Database connected successfully", "info")
-                return conn
+            with self.db_pool.connection():
+                pass
+            self.db_status_label.setText("Database: Connected")
+            self.db_status_label.setStyleSheet("color: green;")
+            self.log_message("Database connected successfully", "info")
+            return True
         except mysql.connector.Error as e:
             if e.errno == errorcode.ER_BAD_DB_ERROR:
                 try:
@@ -1100,6 +3578,7 @@ class DetectionUI(QMainWindow):
                     cursor.execute(f"CREATE DATABASE {DB_CONFIG['database']}")
                     temp_conn.close()
                     # Retry connection
+                    self.db_pool.reset()
                     return self.connect_database()
                 except mysql.connector.Error as e:
                     self.db_status_label.setText("Database: Not connected")
@@ -1109,78 +3588,142 @@ class DetectionUI(QMainWindow):
                 self.db_status_label.setText("Database: Not connected")
                 self.db_status_label.setStyleSheet("color: red;")
                 self.log_message(f"Database connection failed: {e}", "error")
-        return None
+        return False
 
     def reconnect_database(self):
         """Reconnect to database"""
         self.log_message("Attempting to reconnect to database...", "info")
-        if hasattr(self, 'db_connection') and self.db_connection and self.db_connection.is_connected():
-            self.db_connection.close()
-            
-        self.db_connection = self.connect_database()
-        if self.db_connection and self.db_connection.is_connected():
+        self.db_pool.reset()
+        if self.connect_database():
             self.load_today_summary()
 
-    def create_table(self):
-        """Create the detection_results table if it doesn't exist"""
-        if self.db_connection and self.db_connection.is_connected():
-            try:
-                cursor = self.db_connection.cursor()
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS detection_results (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        single_circlip_percentage FLOAT NOT NULL,
-                        multiple_circlips_percentage FLOAT NOT NULL,
-                        no_circlip_percentage FLOAT NOT NULL,
-                        result VARCHAR(10) NOT NULL
-                    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
-                """)
-                self.db_connection.commit()
-                self.log_message("Database table verified/created", "info")
-            except mysql.connector.Error as e:
-                self.log_message(f"Error creating table: {e}", "error")
-            finally:
-                cursor.close()
-
-    def connect_plc(self):
-        """Establish connection to PLC"""
+    def migrate_schema(self):
+        """Bring the database schema up to the latest version"""
         try:
-            s = mc.open_socket(PLC_HOST, PLC_PORT)
-            if s:
-                self.plc_status_label.setText("PLC: Connected")
-                self.plc_status_label.setStyleSheet("color: green;")
-                self.log_message("PLC connected successfully", "info")
-                return s
-            self.log_message("PLC connection failed", "error")
-        except Exception as e:
-            self.log_message(f"PLC connection error: {e}", "error")
-        self.plc_status_label.setText("PLC: Not connected")
-        self.plc_status_label.setStyleSheet("color: red;")
-        return None
+            with self.db_pool.connection() as connection:
+                applied = SchemaMigrator(connection).migrate()
+            for description in applied:
+                self.log_message(f"Schema migration applied: {description}", "info")
+            self.log_message("Database schema up to date", "info")
+        except mysql.connector.Error as e:
+            self.log_message(f"Schema migration failed: {e}", "error")
+
+    def start_plc(self):
+        """Start the PLC worker, which connects and reconnects in the background"""
+        self.plc_started = time.perf_counter()
+        self.plc_first_status = True
+        self.plc = PLCWorker(stage_observer=self.metrics)
+        self.plc.log_signal.connect(self.log_message)
+        self.plc.status_signal.connect(self.update_plc_status)
+        self.plc.start()
+
+    def update_plc_status(self, connected):
+        if connected:
+            self.plc_status_label.setText("PLC: Connected")
+            self.plc_status_label.setStyleSheet("color: green;")
+        else:
+            self.plc_status_label.setText("PLC: Not connected")
+            self.plc_status_label.setStyleSheet("color: red;")
+        if self.plc_first_status:
+            self.plc_first_status = False
+            self.profiler.record("plc connect (background)", time.perf_counter() - self.plc_started)
+            self.startup_phase_done()
+
+    def load_model(self):
+        """Load and warm up the YOLO model in the background at startup"""
+        self.model_loader = ModelLoaderThread(self.model_service)
+        self.model_loader.log_signal.connect(self.log_message)
+        self.model_loader.loaded_signal.connect(self.model_loaded)
+        self.model_loader.start()
+
+    def model_loaded(self, seconds):
+        self.profiler.record("model load (background)", seconds)
+        self.startup_phase_done()
+
+    def start_result_writer(self):
+        """Start the background writer that stores detection results"""
+        self.result_writer = ResultWriter(self.db_pool, RESULT_SPOOL_FILE, self.metrics)
+        self.result_writer.log_signal.connect(self.log_message)
+        # Refresh once the rows have actually reached the database
+        self.result_writer.changed_signal.connect(self.refresh_today_summary)
+        self.result_writer.deleted_signal.connect(self.remove_summary_row)
+        self.result_writer.start()
+
+    def start_capture(self):
+        """Open the camera once and keep it streaming into the frame ring"""
+        self.capture = CaptureThread(self.capture_source)
+        self.capture.log_signal.connect(self.log_message)
+        self.capture.start()
+        
+        self.preview = PreviewThread(self.capture, self.model_service.roi, stage_observer=self.metrics)
+        self.preview.frame_signal.connect(self.update_frame)
+        self.preview.start()
 
     def reconnect_plc(self):
         """Reconnect to PLC"""
-        self.log_message("Attempting to reconnect to PLC...", "info")
-        if hasattr(self, 'plc_socket') and self.plc_socket:
-            self.plc_socket.close()
-            
-        self.plc_socket = self.connect_plc()
+        if self.plc is not None:
+            self.plc.reconnect_now()
 
-    def load_logo(self):
-        """Load company logo"""
+    def start_metrics_server(self):
+        """Serve the stage metrics in Prometheus text format on the local HTTP port"""
+        if METRICS_HTTP_PORT is None:
+            return
+        server = MetricsServer(self.metrics)
         try:
-            response = requests.get(LOGO_URL, timeout=5)
-            img = Image.open(BytesIO(response.content))
-            img_byte_arr = BytesIO()
-            img.save(img_byte_arr, 'JPEG')
-            qimg = QImage()
-            qimg.loadFromData(img_byte_arr.getvalue())
-            pixmap = QPixmap.fromImage(qimg)
+            port = server.start()
+        except OSError as e:
+            self.log_message(f"Metrics endpoint unavailable: {e}", "warning")
+            return
+        self.metrics_server = server
+        url = f"http://{METRICS_HTTP_HOST}:{port}/metrics"
+        self.metrics_info_label.setText(
+            f"Stage timings over the last {METRICS_WINDOW:g} seconds - Prometheus: {url}")
+        self.log_message(f"Metrics available at {url}", "info")
+
+    def refresh_metrics(self, *_):
+        """Show the rolling stage percentiles while the Metrics tab is open"""
+        if self.tab_widget.currentWidget() is not self.metrics_tab:
+            return
+        rows = self.metrics.rolling()
+        self.metrics_table.setRowCount(len(rows))
+        for row, (stage, label, samples, rate, quantiles) in enumerate(rows):
+            values = [label, str(samples), f"{rate:.2f}"] + [
+                "--" if value is None else f"{value * 1000:.1f}" for value in quantiles]
+            for column, value in enumerate(values):
+                item = self.metrics_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if column:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    self.metrics_table.setItem(row, column, item)
+                item.setText(value)
+
+    def load_logos(self):
+        """Show the cached logos and fetch missing ones in the background"""
+        self.logo_label.setText("Logo")
+        missing = []
+        # Window icon is the logo in the title bar
+        for name, url in (("window_icon", TITLE_LOGO_URL), ("logo", LOGO_URL)):
+            path = logo_cache_path(name)
+            if os.path.exists(path):
+                self.show_logo(name, path)
+            else:
+                missing.append((name, url))
+                
+        if missing:
+            self.logo_thread = LogoFetchThread(missing)
+            self.logo_thread.logo_signal.connect(self.show_logo)
+            self.logo_thread.log_signal.connect(self.log_message)
+            self.logo_thread.start()
+
+    def show_logo(self, name, path):
+        pixmap = QPixmap(path)
+        if pixmap.isNull():
+            self.log_message(f"Could not load {path}", "warning")
+        elif name == "window_icon":
+            self.setWindowIcon(QIcon(pixmap))
+        else:
             self.logo_label.setPixmap(pixmap.scaled(120, 60, Qt.KeepAspectRatio))
-        except Exception as e:
-            self.log_message(f"Could not load logo: {e}", "warning")
-            self.logo_label.setText("Logo")
 
     def add_alert_system(self):
         """Initialize alert system"""
@@ -1213,19 +3756,67 @@ class DetectionUI(QMainWindow):
         """Clean up resources when closing"""
         self.stop_detection()
         
-        if hasattr(self, 'db_connection') and self.db_connection and self.db_connection.is_connected():
-            self.db_connection.close()
-            self.log_message("Database connection closed", "info")
+        if hasattr(self, 'preview') and self.preview:
+            self.preview.stop()
+            
+        if hasattr(self, 'capture') and self.capture:
+            self.capture.stop()
+            
+        if hasattr(self, 'result_writer') and self.result_writer:
+            self.result_writer.stop()
+            
+        if self.csv_export_thread is not None and self.csv_export_thread.isRunning():
+            self.csv_export_thread.cancel()
+            self.csv_export_thread.wait()
             
-        if hasattr(self, 'plc_socket') and self.plc_socket:
-            self.plc_socket.close()
+        if self.pdf_report_thread is not None and self.pdf_report_thread.isRunning():
+            self.pdf_report_thread.wait()
+            
+        if self.logo_thread is not None:
+            self.logo_thread.wait()
+            
+        if self.model_loader is not None:
+            self.model_loader.wait()
+            
+        if hasattr(self, 'db_pool') and self.db_pool:
+            self.db_pool.reset()
+            self.log_message("Database connections closed", "info")
+            
+        if self.plc is not None:
+            self.plc.stop()
             self.log_message("PLC connection closed", "info")
             
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            
         event.accept()
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Circlip detection station")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each startup phase took")
+    parser.add_argument("--source",
+                        help="camera index, stream URL, or footage to replay: a video file, "
+                             "an image directory or a .npz frame archive")
+    parser.add_argument("--max-speed", action="store_true",
+                        help="replay as fast as inspection cycles take frames instead of in real time")
+    parser.add_argument("--loop", action="store_true", help="restart the replay when it ends")
+    # Anything else is left for Qt
+    args, qt_args = parser.parse_known_args()
+    
+    capture_source = CAPTURE_SOURCE
+    if args.source is not None:
+        if args.source.isdigit():
+            capture_source = int(args.source)
+        elif "://" in args.source:
+            capture_source = args.source
+        else:
+            capture_source = open_replay_source(args.source, realtime=not args.max_speed, loop=args.loop)
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle('Fusion')
-    window = DetectionUI()
+    profiler = StartupProfiler(args.profile_startup)
+    window = DetectionUI(profiler, capture_source)
     window.show()
+    profiler.record("window shown (since launch)", time.perf_counter() - STARTUP_STARTED)
     sys.exit(app.exec_())
\ No newline at end of file